@@ -0,0 +1,179 @@
+import heapq
+import io
+import os
+import shutil
+import tempfile
+import rdflib
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+from rdflib.compare import to_canonical_graph
+from rdflib.util import guess_format
+from parallel_import import split_compression
+
+LITERAL_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+
+
+def nt_term(term):
+    # Literal.n3() writes multi-line strings in triple quotes, which N-Triples doesn't allow
+    if not isinstance(term, rdflib.Literal):
+        return term.n3()
+    quoted = '"%s"' % str(term).translate(LITERAL_ESCAPES)
+    if term.language:
+        return f"{quoted}@{term.language}"
+    if term.datatype:
+        return f"{quoted}^^{term.datatype.n3()}"
+    return quoted
+
+
+def nt_row(triple):
+    return " ".join(nt_term(term) for term in triple) + " .\n"
+
+
+def has_blank_node(triple):
+    return isinstance(triple[0], rdflib.BNode) or isinstance(triple[2], rdflib.BNode)
+
+
+class TripleBuffer:
+    # Sink for the N-Triples parser
+    def __init__(self):
+        self.triples = []
+
+    def triple(self, s, p, o):
+        self.triples.append((s, p, o))
+
+
+class ExternalSorter:
+    # Sorts and de-duplicates lines that may not fit in memory: sorted runs of
+    # run_size lines are spilled to disk and k-way merged at the end.
+
+    def __init__(self, run_size=500000, temp_dir=None):
+        self.run_size = run_size
+        self.temp_dir = temp_dir
+        self.buffer = []
+        self.runs = []
+
+    def add(self, line):
+        self.buffer.append(line)
+        if len(self.buffer) >= self.run_size:
+            self.spill()
+
+    def spill(self):
+        if not self.buffer:
+            return
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", newline="\n", dir=self.temp_dir,
+                                         prefix="run-", suffix=".nt", delete=False) as run:
+            previous = None
+            for line in sorted(self.buffer):
+                if line != previous:
+                    run.write(line)
+                    previous = line
+        self.runs.append(run.name)
+        self.buffer = []
+
+    def write(self, destination):
+        # Python's code point order is the same as UTF-8 byte order, so the output sorts like `LC_ALL=C sort`
+        self.buffer.sort()
+        runs = [open(path, encoding="utf-8", newline="\n") for path in self.runs]
+        count = 0
+        try:
+            with open(destination, "w", encoding="utf-8", newline="\n") as out:
+                previous = None
+                for line in heapq.merge(self.buffer, *runs):
+                    if line != previous:
+                        out.write(line)
+                        previous = line
+                        count += 1
+        finally:
+            for run in runs:
+                run.close()
+            for path in self.runs:
+                os.remove(path)
+            self.runs = []
+            self.buffer = []
+        return count
+
+
+class CanonicalExporter:
+    # Canonical N-Triples: blank nodes are relabelled by rdflib's canonical
+    # graph algorithm, lines are sorted and de-duplicated, so isomorphic graphs
+    # give byte-identical files. Only triples touching blank nodes are kept in
+    # memory; everything else streams through the sorter.
+
+    def __init__(self, run_size=500000):
+        self.run_size = run_size
+
+    def export_graph(self, graph, destination):
+        # graph is read twice, so pass a snapshot when others may write to it meanwhile
+        if isinstance(graph, rdflib.Graph):
+            return self.export([lambda: iter(graph)], destination)
+        # Remote graphs can't be read twice with stable blank nodes, so take a local copy first
+        temp_dir = tempfile.mkdtemp(prefix="canonical-")
+        try:
+            copy = os.path.join(temp_dir, "graph.nt")
+            with open(copy, "w", encoding="utf-8", newline="\n") as out:
+                for triple in graph:
+                    out.write(nt_row(triple))
+            return self.export_files([copy], destination)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def export_files(self, paths, destination):
+        # N-Triples files (optionally compressed) are streamed; other formats are
+        # parsed one file at a time and converted to N-Triples in a temp directory
+        temp_dir = tempfile.mkdtemp(prefix="canonical-")
+        try:
+            sources = []
+            for i, path in enumerate(paths):
+                name, opener = split_compression(path)
+                if not name.lower().endswith(".nt"):
+                    graph = rdflib.Graph()
+                    with opener(path, "rb") as source:
+                        graph.parse(source=source, format=guess_format(name) or "xml")
+                    path = os.path.join(temp_dir, f"{i}.nt")
+                    graph.serialize(destination=path, format="nt", encoding="utf-8")
+                    opener = open
+                sources.append(self.ntriples_source(path, opener))
+            return self.export(sources, destination, temp_dir)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def ntriples_source(self, path, opener):
+        # Blank node labels are file-scoped; sharing the context between passes keeps the BNode objects stable
+        bnode_context = {}
+
+        def triples():
+            sink = TripleBuffer()
+            parser = W3CNTriplesParser(sink)
+            with opener(path, "rb") as source:
+                while True:
+                    lines = source.readlines(1 << 20)
+                    if not lines:
+                        break
+                    parser.parse(io.BytesIO(b"".join(lines)), bnode_context=bnode_context)
+                    yield from sink.triples
+                    sink.triples = []
+        return triples
+
+    def export(self, sources, destination, temp_dir=None):
+        # sources are callables returning triple iterators; each is read twice
+        bnode_graph = rdflib.Graph()
+        for source in sources:
+            for triple in source():
+                if has_blank_node(triple):
+                    bnode_graph.add(triple)
+        # Labels depend only on the graph's structure, not on the order it was parsed in
+        canonical = to_canonical_graph(bnode_graph)
+        del bnode_graph
+
+        sorter = ExternalSorter(self.run_size, temp_dir)
+        blank_nodes = set()
+        for triple in canonical:
+            blank_nodes.update(term for term in triple if isinstance(term, rdflib.BNode))
+            sorter.add(nt_row(triple))
+        del canonical
+        for source in sources:
+            for triple in source():
+                if not has_blank_node(triple):
+                    sorter.add(nt_row(triple))
+        count = sorter.write(destination)
+        print(f"Canonical export: {count} triples, {len(blank_nodes)} blank nodes written to {destination}")
+        return count
@@ -0,0 +1,169 @@
+import re
+import unicodedata
+import zlib
+from collections import namedtuple
+import numpy as np
+import rdflib
+from label_service import LABEL_PREDICATES
+
+Candidate = namedtuple("Candidate", ["first", "second", "similarity"])
+
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+def normalize_label(text):
+    # "Dürer, Albrecht (1471-1528)" -> "durer albrecht 1471 1528"
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(re.findall(r"\w+", text))
+
+
+def shingles(text, size=3):
+    padded = f" {text} "
+    return {padded[i:i + size] for i in range(max(1, len(padded) - size + 1))}
+
+
+def choose_bands(num_perm, threshold):
+    # Pick bands * rows = num_perm so that the LSH S-curve turns at roughly the threshold
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, node):
+        root = node
+        while self.parent.get(root, root) != root:
+            root = self.parent[root]
+        while node != root:
+            self.parent[node], node = root, self.parent.get(node, node)
+        return root
+
+    def union(self, first, second):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            # The smaller URI becomes the canonical one, so merges are deterministic
+            if second < first:
+                first, second = second, first
+            self.parent[second] = first
+
+
+class DuplicateDetector:
+    # MinHash signatures over label trigrams and key property values, LSH
+    # banding to find candidate pairs without comparing all pairs, then the
+    # exact Jaccard similarity of each candidate's feature sets.
+
+    def __init__(self, threshold=0.8, num_perm=64, key_properties=(), max_bucket=100, seed=1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.key_properties = [rdflib.URIRef(p) for p in key_properties]
+        self.max_bucket = max_bucket
+        random = np.random.RandomState(seed)
+        self.a = random.randint(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self.b = random.randint(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def features(self, graph, instances):
+        wanted = set(instances)
+        labels = {}
+        for predicate in LABEL_PREDICATES:
+            for subject, label in graph.subject_objects(predicate):
+                if subject in wanted:
+                    labels.setdefault(subject, []).append(str(label))
+        features = {}
+        for subject, subject_labels in labels.items():
+            features[subject] = set().union(*(shingles(normalize_label(label)) for label in subject_labels))
+        for predicate in self.key_properties:
+            name = predicate.split('/')[-1].split('#')[-1]
+            for subject, value in graph.subject_objects(predicate):
+                if subject in wanted:
+                    value = normalize_label(value) if isinstance(value, rdflib.Literal) else str(value)
+                    features.setdefault(subject, set()).add(f"{name}={value}")
+        return features
+
+    def signatures(self, features, chunk_size=50000):
+        # One row per instance: the minimum of each hash permutation over its features
+        nodes = list(features)
+        hashes = [np.array([zlib.crc32(f.encode("utf-8")) for f in features[node]], dtype=np.uint64) for node in nodes]
+        counts = np.array([len(h) for h in hashes], dtype=np.int64)
+        values = np.concatenate(hashes) if hashes else np.zeros(0, dtype=np.uint64)
+        signatures = np.zeros((len(nodes), self.num_perm), dtype=np.uint64)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        for start in range(0, len(nodes), chunk_size):
+            end = min(start + chunk_size, len(nodes))
+            chunk = values[offsets[start]:offsets[end]]
+            permuted = (chunk[:, None] * self.a + self.b) % np.uint64(MERSENNE_PRIME)
+            signatures[start:end] = np.minimum.reduceat(permuted, offsets[start:end] - offsets[start], axis=0)
+        return nodes, signatures
+
+    def candidate_pairs(self, signatures):
+        bands, rows = choose_bands(self.num_perm, self.threshold)
+        pairs = set()
+        for band in range(bands):
+            block = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+            keys = block.view(np.dtype((np.void, block.dtype.itemsize * rows))).ravel()
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            boundaries = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+            for bucket in np.split(order, boundaries):
+                if len(bucket) < 2:
+                    continue
+                # Huge buckets are usually empty or boilerplate labels; only pair neighbours there
+                if len(bucket) > self.max_bucket:
+                    pairs.update((min(first, second), max(first, second))
+                                 for first, second in zip(bucket[:-1].tolist(), bucket[1:].tolist()))
+                    continue
+                bucket = bucket.tolist()
+                for i, first in enumerate(bucket):
+                    for second in bucket[i + 1:]:
+                        pairs.add((first, second) if first < second else (second, first))
+        return pairs
+
+    def find_duplicates(self, graph, instances):
+        features = self.features(graph, instances)
+        features = {node: values for node, values in features.items() if values}
+        nodes, signatures = self.signatures(features)
+        candidates = []
+        for first, second in self.candidate_pairs(signatures):
+            first_features, second_features = features[nodes[first]], features[nodes[second]]
+            # Jaccard can't exceed the ratio of the set sizes, which skips most pairs without intersecting
+            smaller, larger = sorted((len(first_features), len(second_features)))
+            if smaller < self.threshold * larger:
+                continue
+            shared = len(first_features & second_features)
+            similarity = shared / (len(first_features) + len(second_features) - shared)
+            if similarity >= self.threshold:
+                candidates.append(Candidate(nodes[first], nodes[second], similarity))
+        candidates.sort(key=lambda c: (-c.similarity, str(c.first), str(c.second)))
+        print(f"Duplicate detection: {len(nodes)} instances, {len(candidates)} candidate pairs")
+        return candidates
+
+    def merge_changes(self, graph, pairs, same_as=True):
+        # Returns (added, removed) triples merging every connected group of pairs into its smallest URI
+        groups = UnionFind()
+        for first, second in pairs:
+            groups.union(first, second)
+        duplicates = {node: groups.find(node) for node in list(groups.parent) if groups.find(node) != node}
+        added = []
+        removed = []
+        if same_as:
+            for duplicate, canonical in duplicates.items():
+                added.append((duplicate, rdflib.OWL.sameAs, canonical))
+            return added, removed
+        for duplicate, canonical in duplicates.items():
+            for _, predicate, object_ in graph.triples((duplicate, None, None)):
+                removed.append((duplicate, predicate, object_))
+                added.append((canonical, predicate, duplicates.get(object_, object_)))
+            for subject, predicate, _ in graph.triples((None, None, duplicate)):
+                if subject not in duplicates:
+                    removed.append((subject, predicate, duplicate))
+                    added.append((subject, predicate, canonical))
+        return added, removed
@@ -0,0 +1,153 @@
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTreeWidget, QTreeWidgetItem, QComboBox, QDoubleSpinBox, QLineEdit
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+import rdflib
+from duplicate_detector import DuplicateDetector
+from sparql_endpoint import EndpointGraph, EndpointError
+
+
+class DuplicateWorker(QThread):
+    duplicates_found = pyqtSignal(list)
+
+    def __init__(self, detector, graph, instances):
+        super().__init__()
+        self.detector = detector
+        self.graph = graph
+        self.instances = instances
+
+    def run(self):
+        self.duplicates_found.emit(self.detector.find_duplicates(self.graph, self.instances))
+
+
+class DuplicatePanel(QWidget):
+    max_rows = 5000
+    default_classes = ["E21_Person", "E74_Group", "E53_Place"]
+
+    def __init__(self, ontology_viewer):
+        super().__init__()
+        self.ontology_viewer = ontology_viewer
+        self.detector = None
+        self.worker = None
+
+        self.layout = QVBoxLayout()
+        self.setLayout(self.layout)
+
+        self.class_combo = QComboBox()
+        self.threshold_spin = QDoubleSpinBox()
+        self.threshold_spin.setRange(0.3, 1.0)
+        self.threshold_spin.setSingleStep(0.05)
+        self.threshold_spin.setValue(0.8)
+        self.threshold_spin.setToolTip("Minimum estimated Jaccard similarity of label trigrams and key property values")
+        self.key_properties_input = QLineEdit()
+        self.key_properties_input.setPlaceholderText("Key properties, comma-separated (e.g. P2_has_type)")
+        self.find_button = QPushButton("Find Duplicates")
+        self.find_button.clicked.connect(self.find_duplicates)
+
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("Class:"))
+        controls.addWidget(self.class_combo)
+        controls.addWidget(QLabel("Threshold:"))
+        controls.addWidget(self.threshold_spin)
+        controls.addWidget(self.find_button)
+
+        self.summary_label = QLabel("Not run yet")
+
+        self.results_tree = QTreeWidget()
+        self.results_tree.setHeaderLabels(["Similarity", "Instance", "Duplicate"])
+        self.results_tree.itemClicked.connect(self.on_candidate_clicked)
+
+        self.merge_mode_combo = QComboBox()
+        self.merge_mode_combo.addItem("Link with owl:sameAs", True)
+        self.merge_mode_combo.addItem("Rewrite references to canonical URI", False)
+        self.merge_button = QPushButton("Merge Checked")
+        self.merge_button.clicked.connect(self.merge_checked)
+
+        merge_controls = QHBoxLayout()
+        merge_controls.addWidget(self.merge_mode_combo)
+        merge_controls.addWidget(self.merge_button)
+
+        self.layout.addLayout(controls)
+        self.layout.addWidget(self.key_properties_input)
+        self.layout.addWidget(self.summary_label)
+        self.layout.addWidget(self.results_tree)
+        self.layout.addLayout(merge_controls)
+
+    def refresh_classes(self):
+        viewer = self.ontology_viewer
+        self.class_combo.clear()
+        for class_uri in sorted(viewer.schema_graph.classes, key=viewer.extract_last_part):
+            self.class_combo.addItem(viewer.extract_last_part(class_uri), class_uri)
+        for name in self.default_classes:
+            index = self.class_combo.findText(name)
+            if index >= 0:
+                self.class_combo.setCurrentIndex(index)
+                break
+
+    def key_properties(self):
+        properties = self.ontology_viewer.schema_graph.properties
+        by_name = {self.ontology_viewer.extract_last_part(uri): uri for uri in properties}
+        names = [name.strip() for name in self.key_properties_input.text().split(",") if name.strip()]
+        return [by_name.get(name, name) for name in names]
+
+    def instances(self, class_uri):
+        viewer = self.ontology_viewer
+        if isinstance(viewer.graph, EndpointGraph):
+            instances = set()
+            for subclass in viewer.class_closure.descendants(class_uri, include_self=True):
+                instances.update(viewer.graph.subjects(rdflib.RDF.type, rdflib.URIRef(subclass)))
+            return list(instances)
+        return viewer.type_index.instances_of(class_uri, viewer.class_closure)
+
+    def find_duplicates(self):
+        class_uri = self.class_combo.currentData()
+        if not class_uri or self.worker:
+            return
+        self.detector = DuplicateDetector(self.threshold_spin.value(), key_properties=self.key_properties())
+        self.worker = DuplicateWorker(self.detector, self.ontology_viewer.snapshot(), self.instances(class_uri))
+        self.worker.duplicates_found.connect(self.show_candidates)
+        self.find_button.setEnabled(False)
+        self.summary_label.setText("Searching...")
+        self.worker.start()
+
+    def show_candidates(self, candidates):
+        self.worker.wait()
+        self.worker = None
+        self.find_button.setEnabled(True)
+        viewer = self.ontology_viewer
+        shown = candidates[:self.max_rows]
+        viewer.label_service.resolve_many([str(uri) for c in shown for uri in (c.first, c.second)])
+        self.results_tree.clear()
+        for candidate in shown:
+            item = QTreeWidgetItem([f"{candidate.similarity:.2f}", viewer.display_name(str(candidate.first)), viewer.display_name(str(candidate.second))])
+            item.setData(0, Qt.UserRole, (candidate.first, candidate.second))
+            item.setToolTip(1, str(candidate.first))
+            item.setToolTip(2, str(candidate.second))
+            item.setCheckState(0, Qt.Unchecked)
+            self.results_tree.addTopLevelItem(item)
+        more = f" (showing first {self.max_rows})" if len(candidates) > self.max_rows else ""
+        self.summary_label.setText(f"{len(candidates)} candidate pairs{more}")
+
+    def on_candidate_clicked(self, item, column):
+        first, second = item.data(0, Qt.UserRole)
+        self.ontology_viewer.display_instance_info(str(second if column == 2 else first))
+
+    def merge_checked(self):
+        checked = [self.results_tree.topLevelItem(i) for i in range(self.results_tree.topLevelItemCount())]
+        checked = [item for item in checked if item.checkState(0) == Qt.Checked]
+        if not checked or self.detector is None:
+            return
+        viewer = self.ontology_viewer
+        pairs = [item.data(0, Qt.UserRole) for item in checked]
+        added, removed = self.detector.merge_changes(viewer.graph, pairs, self.merge_mode_combo.currentData())
+        if viewer.read_only():
+            return
+        # One transaction, so the views and indexes see a single diff
+        try:
+            with viewer.change_bus.transaction():
+                viewer.remove_triples(removed)
+                viewer.add_triples(added)
+        except EndpointError as e:
+            viewer.info.setHtml(f"<h2>Merge failed</h2><p>{e}</p>")
+            return
+        for item in checked:
+            self.results_tree.takeTopLevelItem(self.results_tree.indexOfTopLevelItem(item))
+        self.summary_label.setText(f"Merged {len(pairs)} pairs ({len(added)} triples added, {len(removed)} removed)")
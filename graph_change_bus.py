@@ -0,0 +1,132 @@
+import threading
+from collections import deque
+from contextlib import contextmanager
+from PyQt5.QtCore import Qt, QObject, QThread, pyqtSignal
+from versioned_store import VersionedStore
+
+
+class GraphDiff:
+    def __init__(self, added, removed):
+        self.added = added
+        self.removed = removed
+
+    def __len__(self):
+        return len(self.added) + len(self.removed)
+
+    def triples(self):
+        return self.added + self.removed
+
+    def subjects(self):
+        return {s for s, _, _ in self.added} | {s for s, _, _ in self.removed}
+
+    def with_predicate(self, predicates):
+        return [t for t in self.added if t[1] in predicates], [t for t in self.removed if t[1] in predicates]
+
+
+class GraphChangeBus(QObject):
+    # All mutations of the viewer's graph go through here. Changes made inside a
+    # transaction are coalesced (an add followed by a remove cancels out) and
+    # emitted as one GraphDiff when the outermost transaction ends. On a
+    # VersionedStore each commit is published atomically, and apply() may be
+    # called from a worker thread. Every diff goes into one queue in commit
+    # order and is emitted on the GUI thread: right away for a GUI commit,
+    # otherwise when the queued drain request arrives. Triples queued with
+    # edit=True are reported again through edits_committed, restricted to what
+    # the commit actually changed.
+    changed = pyqtSignal(object)
+    edits_committed = pyqtSignal(list, list)
+    diffs_queued = pyqtSignal()
+
+    def __init__(self, graph_source):
+        super().__init__()
+        self.graph_source = graph_source
+        self.depth = 0
+        self.pending = {}
+        self.edited = set()
+        self.queue = deque()
+        self.draining = False
+        self.write_lock = threading.Lock()  # for graphs without a VersionedStore
+        self.diffs_queued.connect(self.drain, Qt.QueuedConnection)
+
+    @contextmanager
+    def transaction(self):
+        self.depth += 1
+        try:
+            yield self
+        finally:
+            self.depth -= 1
+            if self.depth == 0:
+                self.commit()
+
+    def add(self, triple):
+        self.pending[triple] = True
+        if self.depth == 0:
+            self.commit()
+
+    def remove(self, triple):
+        self.pending[triple] = False
+        if self.depth == 0:
+            self.commit()
+
+    def add_many(self, triples, edit=False):
+        with self.transaction():
+            for triple in triples:
+                self.pending[triple] = True
+                if edit:
+                    self.edited.add(triple)
+
+    def remove_many(self, triples, edit=False):
+        with self.transaction():
+            for triple in triples:
+                self.pending[triple] = False
+                if edit:
+                    self.edited.add(triple)
+
+    def commit(self):
+        pending, self.pending = self.pending, {}
+        edited, self.edited = self.edited, set()
+        if not pending:
+            return
+        added, removed = self.apply([t for t, present in pending.items() if present], [t for t, present in pending.items() if not present])
+        if edited:
+            self.edits_committed.emit([t for t in added if t in edited], [t for t in removed if t in edited])
+
+    def apply(self, additions, removals):
+        graph = self.graph_source()
+        if isinstance(getattr(graph, "store", None), VersionedStore):
+            added, removed = graph.store.apply(additions, removals, self.enqueue)
+        else:
+            with self.write_lock:
+                added, removed = self.apply_to_graph(graph, additions, removals)
+                self.enqueue(added, removed)
+        if QThread.currentThread() == self.thread():
+            self.drain()
+        else:
+            self.diffs_queued.emit()
+        return added, removed
+
+    def enqueue(self, added, removed):
+        if added or removed:
+            self.queue.append(GraphDiff(added, removed))
+
+    def drain(self):
+        # A slot that commits again only queues its diff; the loop below delivers it after the current one
+        if self.draining:
+            return
+        self.draining = True
+        try:
+            while self.queue:
+                self.changed.emit(self.queue.popleft())
+        finally:
+            self.draining = False
+
+    def apply_to_graph(self, graph, additions, removals):
+        if hasattr(graph, "apply_changes"):
+            return graph.apply_changes(additions, removals)  # Remote graphs take the diff in one request
+        removed = [triple for triple in removals if triple in graph]
+        added = [triple for triple in additions if triple not in graph]
+        for triple in removed:
+            graph.remove(triple)
+        for triple in added:
+            graph.add(triple)
+        return added, removed
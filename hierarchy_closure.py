@@ -0,0 +1,85 @@
+from collections import deque
+import numpy as np
+
+
+class HierarchyClosure:
+    # Reflexive-transitive closure of a parent relation as a packed bit matrix:
+    # bit (i, j) of self.matrix is set when node j is node i or one of its ancestors.
+
+    def __init__(self, parents, nodes=()):
+        names = set(nodes) | set(parents)
+        for node_parents in parents.values():
+            names.update(node_parents)
+        self.nodes = sorted(names)
+        self.ids = {node: i for i, node in enumerate(self.nodes)}
+        self.size = len(self.nodes)
+        self.matrix = np.zeros((self.size, (self.size + 7) // 8), dtype=np.uint8)
+        self.compute({self.ids[node]: [self.ids[p] for p in node_parents] for node, node_parents in parents.items()})
+
+    def compute(self, parent_ids):
+        for i in range(self.size):
+            self.matrix[i, i >> 3] |= np.uint8(1 << (i & 7))
+        children = {}
+        pending = np.zeros(self.size, dtype=np.int64)
+        for child, node_parents in parent_ids.items():
+            pending[child] = len(node_parents)
+            for parent in node_parents:
+                children.setdefault(parent, []).append(child)
+        # Kahn's order: a node's row is final once all of its parents' rows are
+        queue = deque(np.flatnonzero(pending == 0).tolist())
+        done = 0
+        while queue:
+            node = queue.popleft()
+            done += 1
+            for parent in parent_ids.get(node, ()):
+                self.matrix[node] |= self.matrix[parent]
+            for child in children.get(node, ()):
+                pending[child] -= 1
+                if pending[child] == 0:
+                    queue.append(child)
+        if done < self.size:
+            # Cycles (e.g. mutual subClassOf); iterate the remaining rows to a fixpoint
+            remaining = np.flatnonzero(pending > 0).tolist()
+            changed = True
+            while changed:
+                changed = False
+                for node in remaining:
+                    row = self.matrix[node].copy()
+                    for parent in parent_ids.get(node, ()):
+                        row |= self.matrix[parent]
+                    if not np.array_equal(row, self.matrix[node]):
+                        self.matrix[node] = row
+                        changed = True
+
+    def __contains__(self, node):
+        return node in self.ids
+
+    def is_a(self, node, ancestor):
+        i = self.ids.get(node)
+        j = self.ids.get(ancestor)
+        if i is None or j is None:
+            return node == ancestor
+        return bool((self.matrix[i, j >> 3] >> (j & 7)) & 1)
+
+    def ancestor_mask(self, node):
+        return np.unpackbits(self.matrix[self.ids[node]], count=self.size, bitorder="little").astype(bool)
+
+    def descendant_mask(self, node):
+        j = self.ids[node]
+        return ((self.matrix[:, j >> 3] >> (j & 7)) & 1).astype(bool)
+
+    def ancestors(self, node, include_self=False):
+        if node not in self.ids:
+            return [node] if include_self else []
+        mask = self.ancestor_mask(node)
+        if not include_self:
+            mask[self.ids[node]] = False
+        return [self.nodes[i] for i in np.flatnonzero(mask)]
+
+    def descendants(self, node, include_self=False):
+        if node not in self.ids:
+            return [node] if include_self else []
+        mask = self.descendant_mask(node)
+        if not include_self:
+            mask[self.ids[node]] = False
+        return [self.nodes[i] for i in np.flatnonzero(mask)]
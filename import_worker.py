@@ -0,0 +1,34 @@
+import threading
+from PyQt5.QtCore import QThread, pyqtSignal
+import rdflib
+from parallel_import import ParallelImporter
+
+
+class ImportWorker(QThread):
+    file_done = pyqtSignal(int, int, str, int, str)
+    import_finished = pyqtSignal(object, list)
+
+    def __init__(self, paths, max_workers=None, change_bus=None):
+        super().__init__()
+        self.paths = paths
+        self.max_workers = max_workers
+        self.change_bus = change_bus
+        self.cancel_event = threading.Event()
+        self.committed = False
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        # Merge into a scratch graph here; with a change bus the batch is committed here too, as one atomic version
+        loaded = rdflib.Graph()
+        errors = ParallelImporter(self.max_workers).import_files(self.paths, loaded, self.on_progress, self.cancel_event.is_set)
+        if self.cancel_event.is_set():
+            return  # Nothing is committed, so the graph stays as it was before the import
+        if self.change_bus:
+            self.change_bus.apply(list(loaded), [])
+        self.committed = True
+        self.import_finished.emit(loaded, errors)
+
+    def on_progress(self, done, total, path, count, error):
+        self.file_done.emit(done, total, path, count, error or "")
@@ -35,8 +35,10 @@ class InstanceEditor(QWidget):
         
         if instance_uri and label:
             instance = rdflib.URIRef(instance_uri)
-            self.ontology_viewer.graph.add((instance, rdflib.RDF.type, rdflib.URIRef(self.selected_class)))
-            self.ontology_viewer.graph.add((instance, rdflib.RDFS.label, rdflib.Literal(label, lang="en")))
+            self.ontology_viewer.add_triples([
+                (instance, rdflib.RDF.type, rdflib.URIRef(self.selected_class)),
+                (instance, rdflib.RDFS.label, rdflib.Literal(label, lang="en")),
+            ])
             print(f"Added instance: {instance_uri} of class {self.selected_class} with label {label}")
             self.instance_uri_input.clear()
             self.instance_label_input.clear()
\ No newline at end of file
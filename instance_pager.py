@@ -0,0 +1,109 @@
+from bisect import bisect_right, insort
+import rdflib
+from sparql_endpoint import EndpointGraph, sparql_term
+
+
+class InstancePager:
+    # Per-class instance counts and keyset-paged instance listings ordered by
+    # label. Keys are (lowercased label, uri) tuples, so a page is "the next
+    # page_size keys after the last one shown" and stays stable under edits.
+    # The key each instance was filed under is remembered, so it can be removed
+    # even after its label has changed or been invalidated.
+
+    def __init__(self, ontology_viewer, page_size=1000):
+        self.ontology_viewer = ontology_viewer
+        self.page_size = page_size
+        self.direct_counts = {}
+        self.total_counts = {}
+        self.sorted_keys = {}
+        self.keys_by_uri = {}  # class -> {instance uri: its key in sorted_keys}
+
+    def invalidate(self, class_uris=None):
+        if class_uris is None:
+            self.sorted_keys.clear()
+            self.keys_by_uri.clear()
+            return
+        for class_uri in class_uris:
+            self.sorted_keys.pop(class_uri, None)
+            self.keys_by_uri.pop(class_uri, None)
+
+    def count_instances(self):
+        viewer = self.ontology_viewer
+        if isinstance(viewer.graph, EndpointGraph):
+            direct_query = """
+            SELECT ?class (COUNT(DISTINCT ?instance) AS ?count) WHERE {
+                ?instance a ?class .
+            }
+            GROUP BY ?class
+            """
+            total_query = """
+            SELECT ?class (COUNT(DISTINCT ?instance) AS ?count) WHERE {
+                ?instance a ?type .
+                ?type rdfs:subClassOf* ?class .
+            }
+            GROUP BY ?class
+            """
+            self.direct_counts = {str(row[0]): int(row[1]) for row in viewer.graph.query(direct_query)}
+            self.total_counts = {str(row[0]): int(row[1]) for row in viewer.graph.query(total_query)}
+        else:
+            self.direct_counts, self.total_counts = viewer.type_index.class_counts(viewer.class_closure)
+
+    def sort_key(self, uri):
+        return (self.ontology_viewer.display_name(uri).lower(), uri)
+
+    def local_keys(self, class_uri):
+        keys = self.sorted_keys.get(class_uri)
+        if keys is None:
+            type_index = self.ontology_viewer.type_index
+            uris = [str(type_index.terms.decode(i)) for i in type_index.instance_ids(class_uri)]
+            self.ontology_viewer.label_service.resolve_many(uris)
+            by_uri = {uri: self.sort_key(uri) for uri in uris}
+            keys = sorted(by_uri.values())
+            self.sorted_keys[class_uri] = keys
+            self.keys_by_uri[class_uri] = by_uri
+        return keys
+
+    def add(self, class_uri, uri):
+        keys = self.sorted_keys.get(class_uri)
+        by_uri = self.keys_by_uri.get(class_uri)
+        if keys is not None and uri not in by_uri:
+            key = self.sort_key(uri)
+            by_uri[uri] = key
+            insort(keys, key)
+
+    def remove(self, class_uri, uri):
+        keys = self.sorted_keys.get(class_uri)
+        if keys is None:
+            return
+        key = self.keys_by_uri[class_uri].pop(uri, None)
+        if key is None:
+            return
+        position = bisect_right(keys, key) - 1
+        if position >= 0 and keys[position] == key:
+            del keys[position]
+
+    def page(self, class_uri, after=None):
+        viewer = self.ontology_viewer
+        if not isinstance(viewer.graph, EndpointGraph):
+            keys = self.local_keys(class_uri)
+            start = bisect_right(keys, after) if after is not None else 0
+            return keys[start:start + self.page_size]
+
+        keyset = ""
+        if after is not None:
+            name, uri = rdflib.Literal(after[0]).n3(), rdflib.Literal(after[1]).n3()
+            keyset = f"HAVING (MIN(?name) > {name} || (MIN(?name) = {name} && STR(?instance) > {uri}))"
+        query = f"""
+        SELECT ?instance (MIN(?name) AS ?key) WHERE {{
+            ?instance a {sparql_term(class_uri)} .
+            OPTIONAL {{ ?instance rdfs:label ?label . FILTER ({viewer.language_filter("?label")}) }}
+            BIND (LCASE(COALESCE(STR(?label), REPLACE(STR(?instance), "^.*[/#]", ""))) AS ?name)
+        }}
+        GROUP BY ?instance
+        {keyset}
+        ORDER BY ?key STR(?instance)
+        LIMIT {self.page_size}
+        """
+        keys = [(str(row[1]), str(row[0])) for row in viewer.graph.query(query)]
+        viewer.label_service.resolve_many([uri for _, uri in keys])
+        return keys
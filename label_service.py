@@ -0,0 +1,76 @@
+import rdflib
+from sparql_endpoint import values_query
+
+SKOS_PREF_LABEL = rdflib.URIRef("http://www.w3.org/2004/02/skos/core#prefLabel")
+LABEL_PREDICATES = [SKOS_PREF_LABEL, rdflib.RDFS.label]
+
+
+def parse_languages(text):
+    # "it, en, untagged" -> ["it", "en", ""]
+    languages = []
+    for token in text.split(","):
+        token = token.strip().lower()
+        if token:
+            languages.append("" if token == "untagged" else token)
+    return languages
+
+
+class LabelService:
+    def __init__(self, graph, languages=None, batch_size=500, scan_threshold=5000):
+        self.graph = graph
+        self.languages = languages if languages is not None else ["en", ""]
+        self.batch_size = batch_size
+        self.scan_threshold = scan_threshold
+        self.cache = {}
+
+    def set_graph(self, graph):
+        self.graph = graph
+        self.cache.clear()
+
+    def set_languages(self, languages):
+        self.languages = languages
+        self.cache.clear()
+
+    def invalidate(self, uris=None):
+        if uris is None:
+            self.cache.clear()
+            return
+        for uri in uris:
+            self.cache.pop(str(uri), None)
+
+    def rank(self, predicate, literal):
+        language = (getattr(literal, "language", None) or "").lower()
+        if language in self.languages:
+            language_rank = self.languages.index(language)
+        elif language.split("-")[0] in self.languages:
+            language_rank = self.languages.index(language.split("-")[0])
+        else:
+            return None
+        return (language_rank, LABEL_PREDICATES.index(predicate))
+
+    def resolve_many(self, uris):
+        uris = list(uris)  # Iterated twice below
+        missing = list({str(uri) for uri in uris if str(uri) not in self.cache})
+        if missing:
+            best = {}
+            if len(missing) > self.scan_threshold and isinstance(self.graph, rdflib.Graph):
+                # Many lookups on a local graph: one pass over the label triples beats thousands of VALUES batches
+                wanted = set(missing)
+                rows = ((entity, predicate, label) for predicate in LABEL_PREDICATES
+                        for entity, label in self.graph.subject_objects(predicate) if str(entity) in wanted)
+            else:
+                pattern = "?entity ?predicate ?label . FILTER (?predicate IN (rdfs:label, <%s>))" % SKOS_PREF_LABEL
+                rows = values_query(self.graph, "entity", [rdflib.URIRef(uri) for uri in missing], pattern,
+                                    "?entity ?predicate ?label", self.batch_size)
+            for row in rows:
+                entity, predicate, label = str(row[0]), row[1], row[2]
+                rank = self.rank(predicate, label)
+                if rank is not None and (entity not in best or rank < best[entity][0]):
+                    best[entity] = (rank, str(label))
+            for uri in missing:
+                self.cache[uri] = best[uri][1] if uri in best else None
+        return {str(uri): self.cache[str(uri)] for uri in uris}
+
+    def label(self, uri, default=None):
+        label = self.resolve_many([uri])[str(uri)]
+        return label if label is not None else default
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+import pathlib
+import urllib.parse
+import xml.parsers.expat
+import rdflib
+from label_service import LABEL_PREDICATES
+from canonical_export import nt_row
+
+RDF_NS = str(rdflib.RDF)
+XML_NS = "http://www.w3.org/XML/1998/namespace"
+SKELETON_LINKS = {rdflib.RDF.type, rdflib.RDFS.subClassOf, rdflib.RDFS.subPropertyOf, rdflib.RDFS.domain, rdflib.RDFS.range, rdflib.OWL.inverseOf}
+INDEX_VERSION = 2
+INDEX_DIRECTORY = os.path.join(os.path.expanduser("~"), ".ontology_viewer", "indexes")
+
+
+def expanded(name):
+    # expat reports "namespace local" with namespace_separator=" "
+    return name.replace(" ", "", 1)
+
+
+class IndexScanner:
+    # One expat pass over an RDF/XML file: records the byte range of every
+    # top-level resource element and extracts the skeleton triples (types,
+    # hierarchy, domain/range, labels) needed to build the trees.
+
+    def __init__(self, base):
+        self.base_stack = [base]
+        self.lang_stack = [None]
+        self.depth = 0
+        self.root_start = None
+        self.root_end = None
+        self.entries = {}
+        self.anonymous = []
+        self.current = None  # (subject, start) of the open top-level element
+        self.property = None  # (predicate, lang, datatype) of an open skeleton literal
+        self.link = None  # predicate of an open depth-3 link without rdf:resource
+        self.text = []
+        self.skeleton = []
+        self.node_ids = set()
+
+    def scan(self, path):
+        parser = xml.parsers.expat.ParserCreate(namespace_separator=" ")
+        parser.buffer_text = True
+        parser.StartElementHandler = lambda name, attrs: self.start(parser.CurrentByteIndex, name, attrs)
+        parser.EndElementHandler = lambda name: self.end(parser.CurrentByteIndex)
+        parser.CharacterDataHandler = lambda data: self.text.append(data) if self.property else None
+        with open(path, "rb") as source:
+            parser.ParseFile(source)
+        return self
+
+    def subject(self, attrs, base):
+        if RDF_NS + " about" in attrs:
+            return rdflib.URIRef(urllib.parse.urljoin(base, attrs[RDF_NS + " about"]))
+        if RDF_NS + " ID" in attrs:
+            return rdflib.URIRef(urllib.parse.urljoin(base, "#" + attrs[RDF_NS + " ID"]))
+        return None
+
+    def start(self, offset, name, attrs):
+        self.depth += 1
+        base = urllib.parse.urljoin(self.base_stack[-1], attrs[XML_NS + " base"]) if XML_NS + " base" in attrs else self.base_stack[-1]
+        self.base_stack.append(base)
+        self.lang_stack.append(attrs.get(XML_NS + " lang", self.lang_stack[-1]))
+        if RDF_NS + " nodeID" in attrs:
+            self.node_ids.add(attrs[RDF_NS + " nodeID"])
+        if self.depth == 1:
+            self.root_start = offset
+        elif self.depth == 2:
+            self.close_entry(offset)
+            subject = self.subject(attrs, base)
+            self.current = (subject, offset)
+            if subject is not None and expanded(name) != RDF_NS + "Description":
+                self.skeleton.append((subject, rdflib.RDF.type, rdflib.URIRef(expanded(name))))
+        elif self.depth == 3 and self.current[0] is not None:
+            predicate = rdflib.URIRef(expanded(name))
+            if predicate in SKELETON_LINKS and RDF_NS + " resource" in attrs:
+                self.skeleton.append((self.current[0], predicate, rdflib.URIRef(urllib.parse.urljoin(base, attrs[RDF_NS + " resource"]))))
+            elif predicate in SKELETON_LINKS:
+                self.link = predicate
+            elif predicate in LABEL_PREDICATES and RDF_NS + " resource" not in attrs:
+                self.property = (predicate, self.lang_stack[-1], attrs.get(RDF_NS + " datatype"))
+                self.text = []
+        elif self.depth == 4 and self.link is not None:
+            value = self.subject(attrs, base)
+            if value is not None:
+                self.skeleton.append((self.current[0], self.link, value))
+
+    def end(self, offset):
+        if self.depth == 3:
+            if self.property:
+                predicate, lang, datatype = self.property
+                literal = rdflib.Literal("".join(self.text), lang=lang or None, datatype=None if lang else datatype)
+                self.skeleton.append((self.current[0], predicate, literal))
+            self.property = None
+            self.link = None
+        elif self.depth == 1:
+            self.close_entry(offset)
+            self.root_end = offset
+        self.depth -= 1
+        self.base_stack.pop()
+        self.lang_stack.pop()
+
+    def close_entry(self, offset):
+        # An entry runs up to the next top-level element (or the root's end tag)
+        if self.current is None:
+            return
+        subject, start = self.current
+        if subject is None:
+            self.anonymous.append((start, offset))
+        else:
+            self.entries.setdefault(str(subject), []).append((start, offset))
+        self.current = None
+
+
+class LazyRdfXml:
+    # Opens an RDF/XML file without parsing it: the skeleton is loaded eagerly
+    # and each resource's full description is parsed from its byte range when
+    # first needed. The index is cached in ~/.ontology_viewer/indexes.
+    # Blank nodes named with rdf:nodeID get the same BNode in every range that
+    # is parsed, so a restriction or list split across entries stays connected.
+
+    def __init__(self, path, index_directory=INDEX_DIRECTORY):
+        self.path = path
+        self.base = pathlib.Path(path).absolute().as_uri()
+        digest = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()
+        self.index_path = os.path.join(index_directory, f"{os.path.basename(path)}-{digest[:16]}.json")
+        # Stable across sessions (restored graphs keep these BNodes) and distinct between files
+        self.node_prefix = f"lazy{digest[:12]}"
+        self.loaded = set()
+        self.index = self.read_index() or self.build_index()
+        self.node_ids = set(self.index["node_ids"])
+
+    def read_index(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        stat = os.stat(self.path)
+        if index.get("version") != INDEX_VERSION or index.get("size") != stat.st_size or index.get("mtime") != stat.st_mtime:
+            return None
+        return index
+
+    def build_index(self):
+        scanner = IndexScanner(self.base).scan(self.path)
+        with open(self.path, "rb") as f:
+            prolog = f.read(scanner.root_start)
+            head = f.read(65536)
+        root_tag = head[:self.tag_length(head)]
+        stat = os.stat(self.path)
+        index = {
+            "version": INDEX_VERSION,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            # latin-1 maps bytes 1:1, so the raw prolog survives the JSON round trip whatever the file's encoding
+            "prolog": prolog.decode("latin-1"),
+            "root_tag": root_tag.decode("latin-1"),
+            "entries": scanner.entries,
+            "anonymous": scanner.anonymous,
+            "skeleton": "".join(nt_row(triple) for triple in scanner.skeleton),
+            "node_ids": sorted(scanner.node_ids),
+        }
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            with open(self.index_path, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+        except OSError as e:
+            print(f"Error writing index {self.index_path}: {e}")
+        return index
+
+    def tag_length(self, data):
+        # Length of the start tag at the beginning of data, skipping '>' inside quoted attribute values
+        quote = None
+        for i, byte in enumerate(data):
+            char = chr(byte)
+            if quote:
+                if char == quote:
+                    quote = None
+            elif char in "\"'":
+                quote = char
+            elif char == ">":
+                return i + 1
+        raise ValueError("Unterminated root element")
+
+    def skeleton(self):
+        graph = rdflib.Graph()
+        graph.parse(data=self.index["skeleton"], format="nt")
+        # Top-level blank nodes (restrictions, disjointness axioms...) can't be looked up later, so load them now
+        for triple in self.parse_ranges(self.index["anonymous"]):
+            graph.add(triple)
+        for prefix, namespace in self.parse_ranges([]).namespaces():
+            graph.bind(prefix, namespace, override=False)
+        return graph
+
+    def parse_ranges(self, ranges):
+        root_tag = self.index["root_tag"].encode("latin-1")
+        root_name = root_tag[1:].split(None, 1)[0].rstrip(b">/")
+        if root_tag.endswith(b"/>"):
+            root_tag = root_tag[:-2] + b">"
+        parts = [self.index["prolog"].encode("latin-1"), root_tag]
+        with open(self.path, "rb") as f:
+            for start, end in ranges:
+                f.seek(start)
+                parts.append(f.read(end - start))
+        parts.append(b"</" + root_name + b">")
+        parsed = rdflib.Graph()
+        parsed.parse(data=b"".join(parts), format="xml", publicID=self.base, preserve_bnode_ids=True)
+        if not self.node_ids:
+            return parsed
+        graph = rdflib.Graph()
+        for prefix, namespace in parsed.namespaces():
+            graph.bind(prefix, namespace, override=False)
+        for triple in parsed:
+            graph.add(tuple(self.node(term) for term in triple))
+        return graph
+
+    def node(self, term):
+        if isinstance(term, rdflib.BNode) and str(term) in self.node_ids:
+            return rdflib.BNode(self.node_prefix + str(term))
+        return term
+
+    def __contains__(self, uri):
+        return str(uri) in self.index["entries"]
+
+    def load(self, uri):
+        # Full description of uri, or [] when it is unknown or already loaded
+        uri = str(uri)
+        if uri in self.loaded or uri not in self.index["entries"]:
+            return []
+        self.loaded.add(uri)
+        return list(self.parse_ranges(self.index["entries"][uri]))
+
+    def load_all(self):
+        pending = [uri for uri in self.index["entries"] if uri not in self.loaded]
+        self.loaded.update(pending)
+        ranges = sorted(r for uri in pending for r in self.index["entries"][uri])
+        return list(self.parse_ranges(ranges)) if ranges else []
@@ -1,9 +1,74 @@
 import sys
+import argparse
+import rdflib
 from PyQt5.QtWidgets import QApplication
 from ontology_viewer import OntologyViewer
+from sparql_server import SparqlServer
+from parallel_import import ParallelImporter
+from module_extractor import ModuleExtractor
+from canonical_export import CanonicalExporter
+from statistics_profiler import StatisticsProfiler, format_report
+from session_snapshot import SessionSnapshot
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Visualize, edit and browse ontologies in cultural heritage")
+    parser.add_argument("--endpoint", help="browse a SPARQL 1.1 endpoint instead of a local graph")
+    parser.add_argument("--update-endpoint", help="SPARQL update endpoint used for edits in endpoint mode")
+    parser.add_argument("--load", nargs="+", metavar="PATH", help="files or directories to import in parallel at startup")
+    parser.add_argument("--lazy", nargs="+", metavar="FILE", help="open large RDF/XML files lazily: load the class/property skeleton and read descriptions on demand")
+    parser.add_argument("--serve", nargs="+", metavar="PATH", help="serve the given files or directories over SPARQL on localhost without starting the GUI")
+    parser.add_argument("--jobs", type=int, help="number of parser processes for multi-file import (default: one per CPU)")
+    parser.add_argument("--extract-module", nargs="+", metavar="PATH", help="extract a module from the given ontology files without starting the GUI")
+    parser.add_argument("--seed", nargs="+", default=[], help="seed classes/properties for --extract-module (URIs or local names like E12_Production)")
+    parser.add_argument("--canonical-export", nargs="+", metavar="FILE", help="write the given files as canonical sorted N-Triples without starting the GUI")
+    parser.add_argument("--sort-buffer", type=int, default=500000, help="lines sorted in memory per spill run for --canonical-export")
+    parser.add_argument("--profile", nargs="+", metavar="FILE", help="print statistics for the given files in one streaming pass, without loading them")
+    parser.add_argument("--output", help="output file for --extract-module (default: module.owl) or --canonical-export (default: canonical.nt)")
+    parser.add_argument("--no-subclasses", action="store_true", help="do not include subclasses of the seed classes in the module")
+    parser.add_argument("--no-session", action="store_true", help="start empty and don't save the session on exit")
+    parser.add_argument("--port", type=int, default=3030, help="port for --serve (default: 3030)")
+    parser.add_argument("--query-timeout", type=int, default=60, help="per-request timeout in seconds for --serve")
+    args, qt_args = parser.parse_known_args()
+    
+    if args.serve:
+        graph = rdflib.Graph()
+        errors = ParallelImporter(args.jobs).import_files(args.serve, graph)
+        print(f"Loaded {len(graph)} triples ({len(errors)} files failed)")
+        SparqlServer(lambda: graph, port=args.port, timeout=args.query_timeout).serve_forever()
+        sys.exit(0)
+    
+    if args.extract_module:
+        graph = rdflib.Graph()
+        ParallelImporter(args.jobs).import_files(args.extract_module, graph)
+        extractor = ModuleExtractor(graph)
+        module = extractor.extract(extractor.resolve_seeds(args.seed), not args.no_subclasses)
+        output = args.output or "module.owl"
+        module.serialize(destination=output, format='xml')
+        print(f"Module saved to {output}")
+        sys.exit(0)
+    
+    if args.profile:
+        profiler = StatisticsProfiler()
+        for file_path in args.profile:
+            profiler.profile_file(file_path)
+        print(format_report(profiler.report()))
+        sys.exit(0)
+    
+    if args.canonical_export:
+        CanonicalExporter(args.sort_buffer).export_files(args.canonical_export, args.output or "canonical.nt")
+        sys.exit(0)
+    
+    app = QApplication(sys.argv[:1] + qt_args)
     window = OntologyViewer()
+    if not args.no_session:
+        window.session = SessionSnapshot(window)
+    if args.endpoint:
+        window.connect_endpoint(args.endpoint, args.update_endpoint)
+    elif args.load:
+        window.import_files(args.load)
+    for file_path in args.lazy or []:
+        window.load_ontology_lazily(file_path)
+    if window.session and not (args.endpoint or args.load or args.lazy):
+        window.session.restore()
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    sys.exit(app.exec_())
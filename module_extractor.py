@@ -0,0 +1,100 @@
+import rdflib
+from schema_graph import SchemaGraph
+
+
+class ModuleExtractor:
+    # Extracts the part of an ontology needed to keep a seed signature logically
+    # complete: superclasses and super-properties of every term, the domains and
+    # ranges of every property, inverses, and the full description of each term
+    # (blank-node restrictions and lists included).
+
+    def __init__(self, graph, schema_graph=None, class_closure=None, property_closure=None):
+        self.graph = graph
+        if schema_graph is None:
+            schema_graph = SchemaGraph()
+            schema_graph.build(graph)
+        self.schema_graph = schema_graph
+        self.class_closure = class_closure or self.schema_graph.class_closure
+        self.property_closure = property_closure or self.schema_graph.property_closure
+        self.inverses = {}
+        for property, inverse in graph.subject_objects(rdflib.OWL.inverseOf):
+            self.inverses.setdefault(str(property), set()).add(str(inverse))
+            self.inverses.setdefault(str(inverse), set()).add(str(property))
+
+    def resolve_seeds(self, names):
+        # Seeds may be full URIs or local names such as E12_Production
+        terms = self.schema_graph.classes | self.schema_graph.properties
+        by_name = {}
+        for uri in terms:
+            by_name.setdefault(uri.split('/')[-1].split('#')[-1], []).append(uri)
+        seeds = []
+        for name in names:
+            if name in terms:
+                seeds.append(name)
+            elif name in by_name:
+                seeds.extend(by_name[name])
+            else:
+                print(f"Unknown seed term: {name}")
+        return seeds
+
+    def signature(self, seeds, include_subclasses=True, include_neighbourhood=True):
+        seed_classes = {s for s in seeds if s in self.schema_graph.classes}
+        seed_properties = {s for s in seeds if s in self.schema_graph.properties}
+        if include_subclasses:
+            for class_uri in list(seed_classes):
+                seed_classes.update(self.class_closure.descendants(class_uri))
+        if include_neighbourhood:
+            # Properties whose domain is one of the seed classes
+            for property, domains in self.schema_graph.domains.items():
+                if domains & seed_classes:
+                    seed_properties.add(property)
+
+        classes = set()
+        properties = set()
+        class_queue = list(seed_classes)
+        property_queue = list(seed_properties)
+        while class_queue or property_queue:
+            while property_queue:
+                property = property_queue.pop()
+                if property in properties:
+                    continue
+                properties.add(property)
+                property_queue.extend(self.property_closure.ancestors(property))
+                property_queue.extend(self.inverses.get(property, ()))
+                class_queue.extend(self.schema_graph.property_classes(property))
+            while class_queue:
+                class_uri = class_queue.pop()
+                if class_uri in classes:
+                    continue
+                classes.add(class_uri)
+                class_queue.extend(self.class_closure.ancestors(class_uri))
+        return classes, properties
+
+    def extract(self, seeds, include_subclasses=True, include_neighbourhood=True):
+        return self.module_graph(*self.signature(seeds, include_subclasses, include_neighbourhood))
+
+    def module_graph(self, classes, properties):
+        module = rdflib.Graph()
+        for prefix, namespace in self.graph.namespaces():
+            module.bind(prefix, namespace)
+        seen = set()
+        for ontology in self.graph.subjects(rdflib.RDF.type, rdflib.OWL.Ontology):
+            self.copy_description(module, ontology, seen, skip={rdflib.OWL.imports})
+        for uri in sorted(classes | properties):
+            self.copy_description(module, rdflib.URIRef(uri), seen)
+        print(f"Extracted module: {len(classes)} classes, {len(properties)} properties, {len(module)} triples")
+        return module
+
+    def copy_description(self, module, node, seen, skip=()):
+        stack = [node]
+        while stack:
+            subject = stack.pop()
+            if subject in seen:
+                continue
+            seen.add(subject)
+            for _, predicate, object_ in self.graph.triples((subject, None, None)):
+                if predicate in skip:
+                    continue
+                module.add((subject, predicate, object_))
+                if isinstance(object_, rdflib.BNode):
+                    stack.append(object_)
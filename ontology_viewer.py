@@ -1,10 +1,31 @@
 import os
-from PyQt5.QtWidgets import QMainWindow, QPushButton, QFileDialog, QVBoxLayout, QWidget, QTreeWidget, QTreeWidgetItem, QTextBrowser, QSplitter, QTabWidget, QComboBox, QTreeWidgetItemIterator, QLineEdit, QLabel
-from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QMainWindow, QPushButton, QFileDialog, QVBoxLayout, QWidget, QTreeWidget, QTreeWidgetItem, QTextBrowser, QSplitter, QTabWidget, QComboBox, QTreeWidgetItemIterator, QLineEdit, QLabel, QListView, QInputDialog, QProgressDialog, QAbstractItemView, QCheckBox, QHBoxLayout
+from PyQt5.QtCore import Qt, QTimer, QUrl
 import rdflib
 from instance_editor import InstanceEditor
 from wizard_editor import WizardEditor
 from reasoning_engine import ReasoningEngine
+from sparql_console import SparqlConsole
+from search_worker import SearchWorker, SearchResultsModel
+from sparql_endpoint import EndpointGraph, EndpointError
+from sparql_server import SparqlServer
+from label_service import LabelService, parse_languages, SKOS_PREF_LABEL
+from schema_graph import SchemaGraph
+from type_index import TypeIndex
+from temporal_index import TemporalIndex, parse_date, OPEN_BEGIN, OPEN_END
+from validation_panel import ValidationPanel
+from validation_engine import SH
+from graph_change_bus import GraphChangeBus
+from import_worker import ImportWorker
+from module_extractor import ModuleExtractor
+from instance_pager import InstancePager
+from canonical_export import CanonicalExporter
+from duplicate_panel import DuplicatePanel
+from statistics_panel import StatisticsPanel
+from lazy_rdfxml import LazyRdfXml
+from versioned_store import VersionedStore
+from session_snapshot import file_stamp
+from parallel_import import expand_paths
 
 class OntologyViewer(QMainWindow):
     def __init__(self):
@@ -14,12 +35,75 @@ class OntologyViewer(QMainWindow):
         self.upload_button = QPushButton("Upload Ontology")
         self.upload_button.clicked.connect(self.upload_ontology)
         
+        self.import_button = QPushButton("Import Directory")
+        self.import_button.clicked.connect(self.import_directory)
+        self.import_worker = None
+        
+        self.lazy_open_button = QPushButton("Open Large RDF/XML Lazily")
+        self.lazy_open_button.setToolTip("Load only the class and property skeleton; descriptions are read from the file when first shown")
+        self.lazy_open_button.clicked.connect(self.open_lazily)
+        self.lazy_sources = []
+        self.sources = []  # what was loaded, with file stamps, for the session snapshot
+        self.edits = {}  # triple -> True (added) / False (removed) by in-app edits on top of the sources
+        self.session = None
+        
         self.save_button = QPushButton("Save Ontology")
         self.save_button.clicked.connect(self.save_ontology)
         
+        self.extract_button = QPushButton("Extract Module from Selection")
+        self.extract_button.setToolTip("Save the selected classes and properties with their superclasses, domains and ranges as a standalone ontology")
+        self.extract_button.clicked.connect(self.extract_module)
+        self.extract_subclasses_check = QCheckBox("Include subclasses of selected classes")
+        self.extract_subclasses_check.setChecked(True)
+        
+        self.endpoint_button = QPushButton("Connect SPARQL Endpoint")
+        self.endpoint_button.clicked.connect(self.choose_endpoint)
+        
+        self.serve_button = QPushButton("Serve Graph over SPARQL")
+        self.serve_button.clicked.connect(self.toggle_sparql_server)
+        self.sparql_server = None
+        
         self.search_bar = QLineEdit()
         self.search_bar.setPlaceholderText("Search entities, properties, instances...")
         self.search_bar.returnPressed.connect(self.search_ontology)
+        self.search_bar.textEdited.connect(self.on_search_text_edited)
+        
+        self.search_class_combo = QComboBox()
+        self.search_class_combo.addItem("All classes", None)
+        self.search_class_combo.currentIndexChanged.connect(lambda: self.on_search_text_edited(self.search_bar.text()))
+        
+        self.date_from_input = QLineEdit()
+        self.date_from_input.setPlaceholderText("From (e.g. 1450)")
+        self.date_to_input = QLineEdit()
+        self.date_to_input.setPlaceholderText("To (e.g. 1500-06-30)")
+        self.date_mode_combo = QComboBox()
+        self.date_mode_combo.addItem("overlapping", False)
+        self.date_mode_combo.addItem("within", True)
+        self.date_mode_combo.setToolTip("Match time-spans that overlap the range, or lie entirely within it")
+        for date_input in (self.date_from_input, self.date_to_input):
+            date_input.setToolTip("Filter instances by their own or a linked event's E52 Time-Span (P82a/P82b)")
+            date_input.textEdited.connect(lambda: self.on_search_text_edited(self.search_bar.text()))
+            date_input.returnPressed.connect(self.search_ontology)
+        self.date_mode_combo.currentIndexChanged.connect(lambda: self.on_search_text_edited(self.search_bar.text()))
+        
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(200)
+        self.search_timer.timeout.connect(self.start_incremental_search)
+        self.search_generation = 0
+        self.search_index = None
+        self.search_index_epoch = 0
+        self.search_workers = []
+        
+        self.search_results_model = SearchResultsModel()
+        self.search_popup = QListView()
+        self.search_popup.setWindowFlags(Qt.ToolTip | Qt.FramelessWindowHint)
+        self.search_popup.setModel(self.search_results_model)
+        self.search_popup.clicked.connect(self.on_search_result_clicked)
+        
+        self.label_languages_input = QLineEdit("en, untagged")
+        self.label_languages_input.setToolTip("Preferred label languages, in order of preference")
+        self.label_languages_input.editingFinished.connect(self.on_label_languages_changed)
         
         self.preloaded_combo = QComboBox()
         self.preloaded_combo.addItem("Select Preloaded Ontology")
@@ -28,6 +112,7 @@ class OntologyViewer(QMainWindow):
         self.tree = QTreeWidget()
         self.tree.setHeaderLabel("Ontology Classes")
         self.tree.itemClicked.connect(self.on_class_item_clicked)
+        self.tree.setSelectionMode(QAbstractItemView.ExtendedSelection)
         
         self.object_properties_wizard_tree = QTreeWidget()
         self.object_properties_wizard_tree.setHeaderLabel("Object Properties Wizard")
@@ -36,10 +121,12 @@ class OntologyViewer(QMainWindow):
         self.object_properties_tree = QTreeWidget()
         self.object_properties_tree.setHeaderLabel("Object Properties")
         self.object_properties_tree.itemClicked.connect(self.on_property_item_clicked)
+        self.object_properties_tree.setSelectionMode(QAbstractItemView.ExtendedSelection)
         
         self.populated_tree = QTreeWidget()
         self.populated_tree.setHeaderLabel("Populated Ontology")
         self.populated_tree.itemClicked.connect(self.on_instance_item_clicked)
+        self.populated_tree.itemExpanded.connect(self.on_populated_item_expanded)
         
         self.info = QTextBrowser()
         self.info.setOpenExternalLinks(False)
@@ -54,13 +141,36 @@ class OntologyViewer(QMainWindow):
         self.tabs.addTab(self.wizard_editor, "Wizard Editor")
         self.tabs.addTab(self.instance_editor, "Instance Editor")
         self.tabs.addTab(self.populated_tree, "Populated Ontology")
+        self.sparql_console = SparqlConsole(self)
+        self.tabs.addTab(self.sparql_console, "SPARQL Console")
+        self.validation_panel = ValidationPanel(self)
+        self.tabs.addTab(self.validation_panel, "Validation")
+        self.duplicate_panel = DuplicatePanel(self)
+        self.tabs.addTab(self.duplicate_panel, "Duplicates")
+        self.statistics_panel = StatisticsPanel(self)
+        self.tabs.addTab(self.statistics_panel, "Statistics")
         
         
         layout = QVBoxLayout()
         layout.addWidget(self.upload_button)
+        layout.addWidget(self.import_button)
+        layout.addWidget(self.lazy_open_button)
         layout.addWidget(self.save_button)
+        layout.addWidget(self.extract_button)
+        layout.addWidget(self.extract_subclasses_check)
+        layout.addWidget(self.endpoint_button)
+        layout.addWidget(self.serve_button)
         layout.addWidget(self.search_bar)
+        layout.addWidget(self.search_class_combo)
+        date_filter_layout = QHBoxLayout()
+        date_filter_layout.addWidget(QLabel("Dated:"))
+        date_filter_layout.addWidget(self.date_mode_combo)
+        date_filter_layout.addWidget(self.date_from_input)
+        date_filter_layout.addWidget(self.date_to_input)
+        layout.addLayout(date_filter_layout)
         layout.addWidget(self.preloaded_combo)
+        layout.addWidget(QLabel("Label languages:"))
+        layout.addWidget(self.label_languages_input)
         layout.addWidget(self.tabs)
         
         left_container = QWidget()
@@ -83,9 +193,27 @@ class OntologyViewer(QMainWindow):
         
         self.setCentralWidget(container)
         
-        self.graph = rdflib.Graph()
+        self.graph = rdflib.Graph(store=VersionedStore())
         self.class_uri_map = {}
         self.property_uri_map = {}
+        self.instance_pager = InstancePager(self)
+        self.instance_pages = {}  # id(class item) -> paging state; QTreeWidgetItem is not hashable
+        self.more_items = {}  # id("Load more" item) -> class item
+        self.label_service = LabelService(self.graph, parse_languages(self.label_languages_input.text()))
+        self.schema_graph = SchemaGraph()
+        self.class_closure = self.schema_graph.class_closure
+        self.property_closure = self.schema_graph.property_closure
+        self.type_index = TypeIndex()
+        self.temporal_index = TemporalIndex()
+        self.class_children = {}
+        self.class_items = {}
+        self.property_items = {}
+        self.populated_items = {}
+        self.view_patch_limit = 2000
+        self.change_bus = GraphChangeBus(lambda: self.graph)
+        self.change_bus.changed.connect(self.on_graph_changed)
+        self.change_bus.edits_committed.connect(self.on_edits_committed)
+        self.change_bus.changed.connect(self.statistics_panel.on_graph_changed)
         
         self.preloaded_folder = "preloaded_ontologies"
         self.load_preloaded_ontologies()
@@ -99,10 +227,8 @@ class OntologyViewer(QMainWindow):
         self.display_all_properties()
         
     def apply_reasoning(self):
-        self.reasoning_engine.apply_reasoning()
-        self.visualize_ontology()
-        self.display_object_properties()
-        self.visualize_populated_ontology()
+        inferred = self.reasoning_engine.apply_reasoning(self.class_closure, self.property_closure, self.type_index)
+        self.add_triples(inferred)
         
     def load_preloaded_ontologies(self):
         if not os.path.exists(self.preloaded_folder):
@@ -115,121 +241,423 @@ class OntologyViewer(QMainWindow):
         if filename != "Select Preloaded Ontology":
             file_path = os.path.join(self.preloaded_folder, filename)
             self.load_ontology(file_path)
-            self.visualize_ontology()
-            self.display_object_properties()
-            self.visualize_populated_ontology()
     
     def upload_ontology(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Open Ontology", "", "OWL files (*.owl);;RDF files (*.rdf)")
         if file_path:
             self.load_ontology(file_path)
-            self.visualize_ontology()
-            self.display_object_properties()
-            self.visualize_populated_ontology()
     
-    def save_ontology(self):
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save Ontology", "", "OWL files (*.owl);;RDF files (*.rdf)")
+    def open_lazily(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open Lazily", "", "RDF/XML files (*.owl *.rdf *.xml)")
         if file_path:
+            self.load_ontology_lazily(file_path)
+    
+    def load_ontology_lazily(self, file_path):
+        if self.refuse_on_endpoint("open a file"):
+            return
+        source = LazyRdfXml(file_path)
+        self.sources.append({"kind": "lazy", "file": file_stamp(file_path)})
+        skeleton = source.skeleton()
+        for prefix, namespace in skeleton.namespaces():
+            self.graph.bind(prefix, namespace, override=False)
+        self.lazy_sources.append(source)
+        self.change_bus.add_many(skeleton)
+    
+    def ensure_loaded(self, uri):
+        triples = [triple for source in self.lazy_sources for triple in source.load(uri)]
+        if triples:
+            self.change_bus.add_many(triples)
+    
+    def materialize(self):
+        # Whole-graph operations (saving, module extraction, validation) need every lazily opened description
+        triples = [triple for source in self.lazy_sources for triple in source.load_all()]
+        if triples:
+            self.change_bus.add_many(triples)
+    
+    def import_directory(self):
+        directory = QFileDialog.getExistingDirectory(self, "Import Directory")
+        if directory:
+            self.import_files([directory])
+    
+    def import_files(self, paths):
+        if self.import_worker or self.refuse_on_endpoint("import files"):
+            return
+        self.import_source = {"kind": "import", "paths": [os.path.abspath(path) for path in paths],
+                              "files": [file_stamp(path) for path in expand_paths(paths)]}
+        self.sources.append(self.import_source)
+        self.import_progress = QProgressDialog("Importing...", None, 0, 0, self)
+        self.import_progress.setWindowTitle("Import")
+        self.import_progress.show()
+        # On a versioned graph the worker commits the batch itself, without blocking the GUI
+        self.import_worker = ImportWorker(paths, change_bus=self.change_bus if self.versioned() else None)
+        self.import_worker.file_done.connect(self.on_import_file_done)
+        self.import_worker.import_finished.connect(self.on_import_finished)
+        self.import_worker.start()
+    
+    def on_import_file_done(self, done, total, path, count, error):
+        self.import_progress.setMaximum(total)
+        self.import_progress.setValue(done)
+        status = f"failed: {error}" if error else f"{count} triples"
+        self.import_progress.setLabelText(f"{os.path.basename(path)}: {status}")
+    
+    def on_import_finished(self, loaded, errors):
+        self.import_worker.wait()
+        self.import_worker = None
+        self.import_progress.close()
+        for prefix, namespace in loaded.namespaces():
+            self.graph.bind(prefix, namespace, override=False)
+        if not self.versioned():
+            self.change_bus.add_many(loaded)
+        if errors:
+            info_text = "<h2>Import Errors:</h2>\n<ul>"
+            for path, error in errors:
+                info_text += f"<li><strong>{path}</strong>: {error}</li>\n"
+            info_text += "</ul>"
+            self.info.setHtml(info_text)
+    
+    def save_ontology(self):
+        file_path, selected_filter = QFileDialog.getSaveFileName(self, "Save Ontology", "", "OWL files (*.owl);;RDF files (*.rdf);;Canonical N-Triples (*.nt)")
+        if not file_path:
+            return
+        self.materialize()
+        if selected_filter.startswith("Canonical") or file_path.lower().endswith(".nt"):
+            # Sorted, de-duplicated, with stable blank node labels: diffs cleanly under version control
+            CanonicalExporter().export_graph(self.snapshot(), file_path)
+        else:
             self.graph.serialize(destination=file_path, format='xml')
-            print(f"Ontology saved to {file_path}")
+        print(f"Ontology saved to {file_path}")
+    
+    def extract_module(self):
+        seeds = set()
+        for tree in (self.tree, self.object_properties_tree):
+            for item in tree.selectedItems():
+                uri = item.data(0, Qt.UserRole)
+                if uri:
+                    seeds.add(uri)
+        if not seeds:
+            self.info.setHtml("<p>Select one or more classes or properties (Ctrl+click) to extract a module.</p>")
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Module", "", "OWL files (*.owl);;RDF files (*.rdf)")
+        if not file_path:
+            return
+        self.materialize()
+        extractor = ModuleExtractor(self.graph, self.schema_graph, self.class_closure, self.property_closure)
+        classes, properties = extractor.signature(seeds, self.extract_subclasses_check.isChecked())
+        module = extractor.module_graph(classes, properties)
+        module.serialize(destination=file_path, format='xml')
+        print(f"Module saved to {file_path}")
+        self.info.setHtml(f"<h2>Module saved</h2><p>{file_path}</p>"
+                          f"<p>{len(seeds)} seed terms, {len(classes)} classes, {len(properties)} properties, {len(module)} triples</p>")
+    
+    def choose_endpoint(self):
+        url, ok = QInputDialog.getText(self, "Connect SPARQL Endpoint", "Query endpoint URL:", text="http://localhost:3030/sparql")
+        if ok and url:
+            update_url, ok = QInputDialog.getText(self, "Connect SPARQL Endpoint", "Update endpoint URL (leave empty for read-only):", text=url)
+            self.connect_endpoint(url, update_url or None)
+    
+    def connect_endpoint(self, url, update_url=None):
+        self.graph = EndpointGraph(url, update_url)
+        self.lazy_sources = []
+        self.sources = [{"kind": "endpoint", "url": url, "update_url": update_url}]
+        self.edits = {}  # Edits to an endpoint are stored there
+        self.reasoning_engine.graph = self.graph
+        self.statistics_panel.reset()
+        self.label_service.set_graph(self.graph)
+        self.graph_changed()
+        self.refresh_views()
+        print(f"Connected to SPARQL endpoint {url}")
+    
+    def toggle_sparql_server(self):
+        if self.sparql_server:
+            self.sparql_server.stop()
+            self.sparql_server = None
+            self.serve_button.setText("Serve Graph over SPARQL")
+            return
+        port, ok = QInputDialog.getInt(self, "Serve Graph over SPARQL", "Port on localhost:", 3030, 1, 65535)
+        if ok:
+            self.start_sparql_server(port)
+    
+    def start_sparql_server(self, port=3030):
+        self.sparql_server = SparqlServer(self.snapshot, port=port)
+        self.sparql_server.start()
+        self.serve_button.setText(f"Stop Serving ({self.sparql_server.url()})")
+    
+    def closeEvent(self, event):
+        self.sparql_console.shutdown()
+        if self.import_worker:
+            self.import_worker.cancel()
+            self.import_worker.wait()
+            if not self.import_worker.committed:
+                # Its triples never reached the graph, so the saved session mustn't list it either
+                self.sources.remove(self.import_source)
+            self.import_worker = None
+        if self.sparql_server:
+            self.sparql_server.stop()
+        if self.session:
+            self.session.save()
+        super().closeEvent(event)
     
     def load_ontology(self, file_path):
-        self.graph.parse(file_path)
+        if self.refuse_on_endpoint("load a file"):
+            return
+        # Parse separately so the merge goes through the change bus as one diff
+        loaded = rdflib.Graph()
+        loaded.parse(file_path)
+        self.sources.append({"kind": "file", "file": file_stamp(file_path)})
+        for prefix, namespace in loaded.namespaces():
+            self.graph.bind(prefix, namespace, override=False)
+        self.change_bus.add_many(loaded)
     
-    def visualize_ontology(self):
-        self.tree.clear()
-        self.class_uri_map.clear()
+    def versioned(self):
+        return isinstance(getattr(self.graph, "store", None), VersionedStore)
+    
+    def snapshot(self):
+        # Consistent read-only view for worker threads; later commits don't show up in it
+        return self.graph.store.snapshot() if self.versioned() else self.graph
+    
+    def graph_changed(self):
+        self.invalidate_search_index()
+        self.label_service.invalidate()
+        # Endpoint graphs are queried directly; local indexes fill from the change bus
+        self.type_index = TypeIndex()
+        self.temporal_index = TemporalIndex()
+        for date_input in (self.date_from_input, self.date_to_input):
+            date_input.setEnabled(not isinstance(self.graph, EndpointGraph))
+        self.rebuild_schema()
+    
+    def rebuild_schema(self):
+        self.schema_graph.build(self.graph)
+        self.class_closure = self.schema_graph.class_closure
+        self.property_closure = self.schema_graph.property_closure
+        self.wizard_editor.refresh_classes()
+        self.refresh_search_classes()
+        self.duplicate_panel.refresh_classes()
+        self.validation_panel.reset()
+    
+    def refuse_on_endpoint(self, action):
+        # Merging a file into the viewer's graph would upload it to the remote store
+        if not isinstance(self.graph, EndpointGraph):
+            return False
+        self.info.setHtml(f"<h2>Cannot {action}</h2><p>Connected to the SPARQL endpoint {self.graph.endpoint_url}; "
+                          "files can only be loaded into a local graph.</p>")
+        return True
+    
+    def read_only(self):
+        if isinstance(self.graph, EndpointGraph) and self.graph.update_pool is None:
+            self.info.setHtml(f"<h2>Read-only endpoint</h2><p>{self.graph.endpoint_url} has no update endpoint configured, "
+                              "so the graph can't be edited.</p>")
+            return True
+        return False
+    
+    def add_triples(self, triples):
+        if self.read_only():
+            return
+        try:
+            self.change_bus.add_many(triples, edit=self.versioned())
+        except EndpointError as e:
+            self.info.setHtml(f"<h2>Update failed</h2><p>{e}</p>")
+    
+    def remove_triples(self, triples):
+        if self.read_only():
+            return
+        try:
+            self.change_bus.remove_many(triples, edit=self.versioned())
+        except EndpointError as e:
+            self.info.setHtml(f"<h2>Update failed</h2><p>{e}</p>")
+    
+    def on_edits_committed(self, added, removed):
+        # Only the net change against the sources is kept: undoing an earlier edit drops it
+        for triple in removed:
+            if self.edits.pop(triple, None) is not True:
+                self.edits[triple] = False
+        for triple in added:
+            if self.edits.pop(triple, None) is not False:
+                self.edits[triple] = True
+    
+    def on_graph_changed(self, diff):
+        # Diffs only hold net changes, so a lazily loaded description that repeats its skeleton
+        # edges and adds blank-node restrictions leaves the schema (and the closures) alone.
+        # SHACL shapes count as schema too, since the validator compiles them up front
+        schema_changed = any(self.schema_graph.uses(triple) or triple[1].startswith(SH) for triple in diff.triples())
+        
+        types_added, types_removed = diff.with_predicate({rdflib.RDF.type})
+        if not isinstance(self.graph, EndpointGraph):
+            for subject, _, class_ in types_added:
+                self.type_index.add(subject, class_)
+            self.type_index.remove_many([(subject, class_) for subject, _, class_ in types_removed])
+            for triple in diff.removed:
+                self.temporal_index.remove(triple)
+            for triple in diff.added:
+                self.temporal_index.add(triple)
+        labels_added, labels_removed = diff.with_predicate({rdflib.RDFS.label, SKOS_PREF_LABEL})
+        relabelled = {str(s) for s, _, _ in labels_added + labels_removed}
+        self.label_service.invalidate(relabelled)
+        if types_added or types_removed or schema_changed:
+            self.invalidate_search_index()
+        if schema_changed:
+            self.rebuild_schema()
+        else:
+            self.validation_panel.validate_nodes(diff.subjects())
+        
+        if len(diff) > self.view_patch_limit:
+            self.refresh_views()
+            return
+        if types_added or types_removed or schema_changed:
+            self.refresh_instance_counts()
+        self.patch_class_trees(diff)
+        self.patch_instances(types_added, types_removed)
+        self.patch_properties(diff)
+        self.patch_labels(relabelled)
+    
+    def refresh_views(self):
+        self.visualize_ontology()
+        self.display_object_properties()
+        self.visualize_populated_ontology()
+    
+    def refresh_search_classes(self):
+        self.search_class_combo.blockSignals(True)
+        self.search_class_combo.clear()
+        self.search_class_combo.addItem("All classes", None)
+        for class_uri in sorted(self.schema_graph.classes, key=self.extract_last_part):
+            self.search_class_combo.addItem(self.extract_last_part(class_uri), class_uri)
+        self.search_class_combo.blockSignals(False)
+    
+    def invalidate_search_index(self):
+        self.search_index = None
+        self.search_index_epoch += 1
+    
+    def on_label_languages_changed(self):
+        languages = parse_languages(self.label_languages_input.text())
+        if languages != self.label_service.languages:
+            self.label_service.set_languages(languages)
+            self.refresh_views()
+    
+    def display_name(self, uri):
+        return self.label_service.label(uri, self.extract_last_part(uri))
+    
+    def language_filter(self, variable):
+        # lang() of an IRI is a type error that drops the row, so non-literals are let through first
+        languages = [language for language in self.label_service.languages if language] + [""]
+        return " || ".join([f"!isLiteral({variable})"] + [f"lang({variable}) = '{language}'" for language in languages])
+    
+    def make_item(self, uri):
+        item = QTreeWidgetItem([self.display_name(uri)])
+        item.setData(0, Qt.UserRole, uri)
+        item.setToolTip(0, uri)
+        return item
+    
+    def load_class_hierarchy(self):
         query = """
         SELECT ?class ?subclass WHERE {
             ?subclass rdfs:subClassOf ?class .
         }
         """
-        class_hierarchy = {}
+        self.class_uri_map.clear()
+        self.class_children = {}
         for row in self.graph.query(query):
             parent = str(row[0])
             child = str(row[1])
-            parent_short = self.extract_last_part(parent)
-            child_short = self.extract_last_part(child)
-            self.class_uri_map[parent_short] = parent
-            self.class_uri_map[child_short] = child
-            if parent_short not in class_hierarchy:
-                class_hierarchy[parent_short] = []
-            class_hierarchy[parent_short].append(child_short)
-        
-        root_classes = [cls for cls in class_hierarchy if all(cls not in children for children in class_hierarchy.values())]
-        
-        for root_class in root_classes:
-            root_item = QTreeWidgetItem([root_class])
-            self.tree.addTopLevelItem(root_item)
-            self.add_children(root_item, root_class, class_hierarchy)
-    
-    def add_children(self, parent_item, parent_class, class_hierarchy):
-        if parent_class in class_hierarchy:
-            for child_class in class_hierarchy[parent_class]:
-                child_item = QTreeWidgetItem([child_class])
-                parent_item.addChild(child_item)
-                self.add_children(child_item, child_class, class_hierarchy)
+            self.class_uri_map[self.extract_last_part(parent)] = parent
+            self.class_uri_map[self.extract_last_part(child)] = child
+            self.class_children.setdefault(parent, []).append(child)
+        self.label_service.resolve_many(self.class_uri_map.values())
+    
+    def root_classes(self):
+        children = {child for class_children in self.class_children.values() for child in class_children}
+        return [cls for cls in self.class_children if cls not in children]
+    
+    def register_item(self, index, item):
+        index.setdefault(item.data(0, Qt.UserRole), []).append(item)
+    
+    def unregister_subtree(self, index, item):
+        items = index.get(item.data(0, Qt.UserRole), [])
+        if item in items:
+            items.remove(item)
+        self.instance_pages.pop(id(item), None)
+        self.more_items.pop(id(item), None)
+        for i in range(item.childCount()):
+            self.unregister_subtree(index, item.child(i))
+    
+    def visualize_ontology(self):
+        self.tree.clear()
+        self.class_items = {}
+        self.load_class_hierarchy()
+        for root_class in self.root_classes():
+            self.tree.addTopLevelItem(self.build_class_subtree(root_class, self.class_items))
+    
+    def build_class_subtree(self, class_uri, index, with_instances=False, seen=()):
+        item = self.make_item(class_uri)
+        self.register_item(index, item)
+        if class_uri in seen:
+            return item  # subClassOf cycle
+        for child_class in self.class_children.get(class_uri, []):
+            item.addChild(self.build_class_subtree(child_class, index, with_instances, seen + (class_uri,)))
+        if with_instances:
+            self.add_instances(item, class_uri)
+        return item
     
     def display_object_properties(self):
         self.object_properties_tree.clear()
         self.property_uri_map.clear()
+        self.property_items = {}
         query = """
-        SELECT ?property ?label ?domain ?range WHERE {
+        SELECT ?property ?domain ?range WHERE {
             ?property a owl:ObjectProperty .
-            OPTIONAL { ?property rdfs:label ?label . }
             OPTIONAL { ?property rdfs:domain ?domain . }
             OPTIONAL { ?property rdfs:range ?range . }
-            FILTER (lang(?label) = 'en' || lang(?label) = '')
         }
         """
         property_hierarchy = {}
         for row in self.graph.query(query):
             property = str(row[0])
-            label = str(row[1]) if row[1] else ""
-            domain = str(row[2]) if row[2] else ""
-            range_ = str(row[3]) if row[3] else ""
+            domain = str(row[1]) if row[1] else ""
+            range_ = str(row[2]) if row[2] else ""
             property_short = self.extract_last_part(property)
             self.property_uri_map[property_short] = property
             self.property_uri_map[property] = property  # Add full URI to map
-            property_hierarchy[property_short] = (label, domain, range_)
+            property_hierarchy[property_short] = (domain, range_)
         
-        for property, (label, domain, range_) in property_hierarchy.items():
-            property_item = QTreeWidgetItem([property])
+        self.label_service.resolve_many(self.property_uri_map.values())
+        for property, (domain, range_) in property_hierarchy.items():
+            property_item = self.make_item(self.property_uri_map[property])
+            self.register_item(self.property_items, property_item)
             self.object_properties_tree.addTopLevelItem(property_item)
 
     def display_all_properties(self):
         self.object_properties_tree.clear()
         self.property_uri_map.clear()
+        self.property_items = {}
         query = """
-        SELECT ?property ?label ?domain ?range WHERE {
+        SELECT ?property ?domain ?range WHERE {
             ?property a owl:ObjectProperty .
-            OPTIONAL { ?property rdfs:label ?label . }
             OPTIONAL { ?property rdfs:domain ?domain . }
             OPTIONAL { ?property rdfs:range ?range . }
-            FILTER (lang(?label) = 'en' || lang(?label) = '')
         }
         """
         property_hierarchy = {}
         for row in self.graph.query(query):
             property = str(row[0])
-            label = str(row[1]) if row[1] else ""
-            domain = str(row[2]) if row[2] else ""
-            range_ = str(row[3]) if row[3] else ""
+            domain = str(row[1]) if row[1] else ""
+            range_ = str(row[2]) if row[2] else ""
             property_short = self.extract_last_part(property)
             self.property_uri_map[property_short] = property
             self.property_uri_map[property] = property  # Add full URI to map
-            property_hierarchy[property_short] = (label, domain, range_)
+            property_hierarchy[property_short] = (domain, range_)
         
-        for property, (label, domain, range_) in property_hierarchy.items():
-            property_item = QTreeWidgetItem([property])
+        # Labels come from the label service, in the configured language order
+        self.label_service.resolve_many(self.property_uri_map.values())
+        for property, (domain, range_) in property_hierarchy.items():
+            label = self.label_service.label(self.property_uri_map[property])
+            property_item = self.make_item(self.property_uri_map[property])
+            self.register_item(self.property_items, property_item)
             self.object_properties_tree.addTopLevelItem(property_item)
             
             if domain:
-                domain_item = QTreeWidgetItem([f"Domain: {self.extract_last_part(domain)}"])
+                domain_item = QTreeWidgetItem([f"Domain: {self.display_name(domain)}"])
                 property_item.addChild(domain_item)
             
             if range_:
-                range_item = QTreeWidgetItem([f"Range: {self.extract_last_part(range_)}"])
+                range_item = QTreeWidgetItem([f"Range: {self.display_name(range_)}"])
                 property_item.addChild(range_item)
             
             if label:
@@ -238,71 +666,189 @@ class OntologyViewer(QMainWindow):
     
     def visualize_populated_ontology(self):
         self.populated_tree.clear()
-        self.class_uri_map.clear()
-        query = """
-        SELECT ?class ?subclass WHERE {
-            ?subclass rdfs:subClassOf ?class .
-        }
-        """
-        class_hierarchy = {}
-        for row in self.graph.query(query):
-            parent = str(row[0])
-            child = str(row[1])
-            parent_short = self.extract_last_part(parent)
-            child_short = self.extract_last_part(child)
-            self.class_uri_map[parent_short] = parent
-            self.class_uri_map[child_short] = child
-            if parent_short not in class_hierarchy:
-                class_hierarchy[parent_short] = []
-            class_hierarchy[parent_short].append(child_short)
-        
-        root_classes = [cls for cls in class_hierarchy if all(cls not in children for children in class_hierarchy.values())]
-        
-        for root_class in root_classes:
-            root_item = QTreeWidgetItem([root_class])
-            self.populated_tree.addTopLevelItem(root_item)
-            self.add_children_with_instances(root_item, root_class, class_hierarchy)
-    
-    def add_children_with_instances(self, parent_item, parent_class, class_hierarchy):
-        if parent_class in class_hierarchy:
-            for child_class in class_hierarchy[parent_class]:
-                child_item = QTreeWidgetItem([child_class])
-                parent_item.addChild(child_item)
-                self.add_children_with_instances(child_item, child_class, class_hierarchy)
-                self.add_instances(child_item, self.class_uri_map[child_class])
+        self.populated_items = {}
+        self.instance_pages = {}
+        self.more_items = {}
+        self.load_class_hierarchy()
+        self.instance_pager.invalidate()
+        self.instance_pager.count_instances()
+        
+        for root_class in self.root_classes():
+            self.populated_tree.addTopLevelItem(self.build_class_subtree(root_class, self.populated_items, with_instances=True))
+    
+    def populated_class_text(self, class_uri):
+        direct = self.instance_pager.direct_counts.get(class_uri, 0)
+        total = self.instance_pager.total_counts.get(class_uri, direct)
+        return f"{self.display_name(class_uri)} ({direct} / {total})"
     
     def add_instances(self, class_item, class_uri):
-        query = f"""
-        SELECT ?instance WHERE {{
-            ?instance a <{class_uri}> .
-        }}
-        """
-        for row in self.graph.query(query):
-            instance_uri = str(row[0])
-            instance_short = self.extract_last_part(instance_uri)
-            instance_item = QTreeWidgetItem([instance_short])
+        # Only the counts are shown up front; instances are listed a page at a time on expand
+        class_item.setText(0, self.populated_class_text(class_uri))
+        class_item.setToolTip(0, f"{class_uri}\n(direct instances / including subclasses)")
+        if self.instance_pager.direct_counts.get(class_uri):
+            class_item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+        self.instance_pages[id(class_item)] = None
+    
+    def on_populated_item_expanded(self, item):
+        if self.instance_pages.get(id(item), False) is None:
+            self.load_instance_page(item)
+    
+    def load_instance_page(self, class_item):
+        class_uri = class_item.data(0, Qt.UserRole)
+        state = self.instance_pages.get(id(class_item)) or {"keys": [], "items": [], "more": None, "uris": set(), "revealed": {}}
+        if state["more"] is not None:
+            self.more_items.pop(id(state["more"]), None)
+            class_item.removeChild(state["more"])
+            state["more"] = None
+        page = self.instance_pager.page(class_uri, state["keys"][-1] if state["keys"] else None)
+        for _, instance_uri in page:
+            revealed = state["revealed"].pop(instance_uri, None)
+            if revealed is not None:
+                # Shown ahead of its page by reveal_instance; move it into place
+                class_item.removeChild(revealed)
+                class_item.addChild(revealed)
+                continue
+            instance_item = self.make_item(instance_uri)
+            self.register_item(self.populated_items, instance_item)
             class_item.addChild(instance_item)
+            state["items"].append(instance_item)
+            state["uris"].add(instance_uri)
+        state["keys"] += page
+        total = self.instance_pager.direct_counts.get(class_uri, 0)
+        if len(page) == self.instance_pager.page_size and len(state["keys"]) < total:
+            state["more"] = QTreeWidgetItem([f"Load more... ({len(state['keys'])} of {total} shown)"])
+            class_item.addChild(state["more"])
+            self.more_items[id(state["more"])] = class_item
+        self.instance_pages[id(class_item)] = state
+    
+    def reload_instances(self, class_item):
+        # Re-list the pages already shown, e.g. after instances were added or removed
+        state = self.instance_pages.get(id(class_item))
+        if not state:
+            return
+        for item in state["items"]:
+            self.unregister_subtree(self.populated_items, item)
+            class_item.removeChild(item)
+        if state["more"] is not None:
+            self.more_items.pop(id(state["more"]), None)
+            class_item.removeChild(state["more"])
+        shown = len(state["keys"])
+        self.instance_pages[id(class_item)] = None
+        self.load_instance_page(class_item)
+        state = self.instance_pages[id(class_item)]
+        while state["more"] is not None and len(state["keys"]) < shown:
+            self.load_instance_page(class_item)
+    
+    def refresh_instance_counts(self):
+        self.instance_pager.count_instances()
+        for class_uri, items in self.populated_items.items():
+            for item in items:
+                if id(item) in self.instance_pages:
+                    item.setText(0, self.populated_class_text(class_uri))
+                    if self.instance_pager.direct_counts.get(class_uri):
+                        item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+    
+    def patch_class_trees(self, diff):
+        added, removed = diff.with_predicate({rdflib.RDFS.subClassOf})
+        added = [(str(c), str(p)) for c, _, p in added if isinstance(c, rdflib.URIRef) and isinstance(p, rdflib.URIRef)]
+        removed = [(str(c), str(p)) for c, _, p in removed]
+        if not added and not removed:
+            return
+        for child, parent in removed:
+            if child in self.class_children.get(parent, []):
+                self.class_children[parent].remove(child)
+                if not self.class_children[parent]:
+                    del self.class_children[parent]
+        for child, parent in added:
+            self.class_uri_map[self.extract_last_part(parent)] = parent
+            self.class_uri_map[self.extract_last_part(child)] = child
+            if child not in self.class_children.setdefault(parent, []):
+                self.class_children[parent].append(child)
+        self.label_service.resolve_many([uri for pair in added for uri in pair])
+        has_parent = {child for children in self.class_children.values() for child in children}
+        
+        for tree, index, with_instances in ((self.tree, self.class_items, False), (self.populated_tree, self.populated_items, True)):
+            top_level = lambda uri: [tree.topLevelItem(i) for i in range(tree.topLevelItemCount()) if tree.topLevelItem(i).data(0, Qt.UserRole) == uri]
+            for child, parent in removed:
+                for parent_item in index.get(parent, []):
+                    for i in reversed(range(parent_item.childCount())):
+                        if parent_item.child(i).data(0, Qt.UserRole) == child:
+                            self.unregister_subtree(index, parent_item.takeChild(i))
+                # Classes only appear while they take part in a subClassOf relation
+                if child not in has_parent and child in self.class_children and not top_level(child):
+                    tree.addTopLevelItem(self.build_class_subtree(child, index, with_instances))
+                if parent not in has_parent and parent not in self.class_children:
+                    for item in top_level(parent):
+                        self.unregister_subtree(index, tree.takeTopLevelItem(tree.indexOfTopLevelItem(item)))
+            for child, parent in added:
+                for item in top_level(child):
+                    self.unregister_subtree(index, tree.takeTopLevelItem(tree.indexOfTopLevelItem(item)))
+                if not index.get(parent):
+                    tree.addTopLevelItem(self.build_class_subtree(parent, index, with_instances))
+                    continue
+                for parent_item in list(index.get(parent, [])):
+                    children = [parent_item.child(i).data(0, Qt.UserRole) for i in range(parent_item.childCount())]
+                    if child not in children:
+                        parent_item.addChild(self.build_class_subtree(child, index, with_instances))
+    
+    def patch_instances(self, added, removed):
+        self.label_service.resolve_many([str(s) for s, _, _ in added])
+        changed = set()
+        for instance, _, class_ in removed:
+            self.instance_pager.remove(str(class_), str(instance))
+            changed.add(str(class_))
+        for instance, _, class_ in added:
+            self.instance_pager.add(str(class_), str(instance))
+            changed.add(str(class_))
+        for class_uri in changed:
+            for class_item in list(self.populated_items.get(class_uri, [])):
+                if self.instance_pages.get(id(class_item)):
+                    self.reload_instances(class_item)
+    
+    def patch_properties(self, diff):
+        added, removed = diff.with_predicate({rdflib.RDF.type})
+        for property, _, type_ in removed:
+            if type_ == rdflib.OWL.ObjectProperty:
+                for item in self.property_items.pop(str(property), []):
+                    self.object_properties_tree.takeTopLevelItem(self.object_properties_tree.indexOfTopLevelItem(item))
+        for property, _, type_ in added:
+            if type_ == rdflib.OWL.ObjectProperty and str(property) not in self.property_items:
+                self.property_uri_map[self.extract_last_part(str(property))] = str(property)
+                self.property_uri_map[str(property)] = str(property)
+                item = self.make_item(str(property))
+                self.register_item(self.property_items, item)
+                self.object_properties_tree.addTopLevelItem(item)
+    
+    def patch_labels(self, uris):
+        if not uris:
+            return
+        self.label_service.resolve_many(uris)
+        self.instance_pager.invalidate()
+        for index in (self.class_items, self.property_items, self.populated_items):
+            for uri in uris:
+                for item in index.get(uri, []):
+                    item.setText(0, self.populated_class_text(uri) if id(item) in self.instance_pages else self.display_name(uri))
     
     def on_class_item_clicked(self, item, column):
-        selected_class_short = item.text(column)
-        print(f"Selected class short: {selected_class_short}")  # Debugging statement
-        if selected_class_short in self.class_uri_map:
-            selected_class = self.class_uri_map[selected_class_short]
+        selected_class = item.data(0, Qt.UserRole)
+        print(f"Selected class: {selected_class}")  # Debugging statement
+        if selected_class:
             self.display_class_info(selected_class)
             self.instance_editor.set_selected_class(selected_class)
             self.wizard_editor.set_selected_class(selected_class)
             self.display_properties_for_selected_class(selected_class)  # New line to display properties
         else:
-            print(f"Error: {selected_class_short} not found in class_uri_map")  # Debugging statement
+            print(f"Error: {item.text(column)} has no class URI")  # Debugging statement
     
     def display_class_info(self, selected_class):
+        self.ensure_loaded(selected_class)
         query = f"""
         SELECT ?property ?value WHERE {{
             <{selected_class}> ?property ?value .
-            FILTER (lang(?value) = 'en' || lang(?value) = '')
+            FILTER ({self.language_filter("?value")})
         }}
         """
-        info_text = f"<h2>Class: <a href='{selected_class}'>{self.extract_last_part(selected_class)}</a></h2>\n"
+        info_text = f"<h2>Class: <a href='{selected_class}'>{self.display_name(selected_class)}</a></h2>\n"
         info_text += "<h3>Properties:</h3>\n"
         for row in self.graph.query(query):
             property = str(row[0])
@@ -315,22 +861,22 @@ class OntologyViewer(QMainWindow):
         
         # Adding Domain and Range Properties
         domain_range_query = f"""
-        SELECT ?property ?label ?domain ?range WHERE {{
+        SELECT ?property ?domain ?range WHERE {{
             {{ ?property rdfs:domain <{selected_class}> . }}
             UNION
             {{ ?property rdfs:range <{selected_class}> . }}
-            OPTIONAL {{ ?property rdfs:label ?label . }}
             OPTIONAL {{ ?property rdfs:domain ?domain . }}
             OPTIONAL {{ ?property rdfs:range ?range . }}
-            FILTER (lang(?label) = 'en' || lang(?label) = '')
         }}
         """
         info_text += "<h3>Domain and Range Properties:</h3>\n"
-        for row in self.graph.query(domain_range_query):
+        rows = list(self.graph.query(domain_range_query))
+        self.label_service.resolve_many([str(row[0]) for row in rows])
+        for row in rows:
             property = str(row[0])
-            label = str(row[1]) if row[1] else ""
-            domain = str(row[2]) if row[2] else ""
-            range_ = str(row[3]) if row[3] else ""
+            label = self.label_service.label(property)
+            domain = str(row[1]) if row[1] else ""
+            range_ = str(row[2]) if row[2] else ""
             property_short = self.extract_last_part(property)
             if domain:
                 domain_short = self.extract_last_part(domain)
@@ -344,41 +890,34 @@ class OntologyViewer(QMainWindow):
         self.info.setHtml(info_text)
     
     def on_property_item_clicked(self, item, column):
-        selected_property_short = item.text(column)
-        print(f"Selected property short: {selected_property_short}")  # Debugging statement
-        if selected_property_short in self.property_uri_map:
-            selected_property = self.property_uri_map[selected_property_short]
+        selected_property = item.data(0, Qt.UserRole)
+        print(f"Selected property: {selected_property}")  # Debugging statement
+        if selected_property:
             self.display_property_info(selected_property)
         else:
-            print(f"Error: {selected_property_short} not found in property_uri_map")  # Debugging statement
+            print(f"Error: {item.text(column)} has no property URI")  # Debugging statement
     
     def on_instance_item_clicked(self, item, column):
-        parent = item.parent()
-        if parent:
-            class_short = parent.text(0)
-            if class_short in self.class_uri_map:
-                instance_short = item.text(0)
-                instance_uri = None
-                query = f"""
-                SELECT ?instance WHERE {{
-                    ?instance a <{self.class_uri_map[class_short]}> .
-                }}
-                """
-                for row in self.graph.query(query):
-                    if self.extract_last_part(str(row[0])) == instance_short:
-                        instance_uri = str(row[0])
-                        break
-                if instance_uri:
-                    self.display_instance_info(instance_uri)
+        if id(item) in self.more_items:
+            self.load_instance_page(self.more_items[id(item)])
+            return
+        uri = item.data(0, Qt.UserRole)
+        if not uri:
+            return
+        if uri in self.class_uri_map.values():
+            self.display_class_info(uri)
+        else:
+            self.display_instance_info(uri)
     
     def display_instance_info(self, instance_uri):
+        self.ensure_loaded(instance_uri)
         query = f"""
         SELECT ?property ?value WHERE {{
             <{instance_uri}> ?property ?value .
-            FILTER (lang(?value) = 'en' || lang(?value) = '')
+            FILTER ({self.language_filter("?value")})
         }}
         """
-        info_text = f"<h2>Instance: <a href='{instance_uri}'>{self.extract_last_part(instance_uri)}</a></h2>\n"
+        info_text = f"<h2>Instance: <a href='{instance_uri}'>{self.display_name(instance_uri)}</a></h2>\n"
         info_text += "<h3>Properties:</h3>\n"
         for row in self.graph.query(query):
             property = str(row[0])
@@ -391,46 +930,50 @@ class OntologyViewer(QMainWindow):
         self.info.setHtml(info_text)
     
     def display_property_info(self, selected_property):
+        self.ensure_loaded(selected_property)
         query = f"""
-        SELECT ?label ?domain ?range WHERE {{
-            <{selected_property}> rdfs:label ?label .
+        SELECT DISTINCT ?domain ?range WHERE {{
+            <{selected_property}> ?predicate ?value .
             OPTIONAL {{ <{selected_property}> rdfs:domain ?domain . }}
             OPTIONAL {{ <{selected_property}> rdfs:range ?range . }}
-            FILTER (lang(?label) = 'en' || lang(?label) = '')
         }}
         """
-        info_text = f"<h2>Property: <a href='{selected_property}'>{self.extract_last_part(selected_property)}</a></h2>\n"
+        info_text = f"<h2>Property: <a href='{selected_property}'>{self.display_name(selected_property)}</a></h2>\n"
         info_text += "<h3>Details:</h3>\n"
+        label = self.label_service.label(selected_property)
+        if label:
+            info_text += f"<p><strong>Label:</strong> {label}</p>\n"
         for row in self.graph.query(query):
-            label = str(row[0])
-            domain = str(row[1]) if row[1] else ""
-            range_ = str(row[2]) if row[2] else ""
+            domain = str(row[0]) if row[0] else ""
+            range_ = str(row[1]) if row[1] else ""
             domain_short = self.extract_last_part(domain)
             range_short = self.extract_last_part(range_)
             if domain in self.class_uri_map.values() or domain in self.property_uri_map.values():
                 domain_short = f"<a href='{domain}'>{domain_short}</a>"
             if range_ in self.class_uri_map.values() or range_ in self.property_uri_map.values():
                 range_short = f"<a href='{range_}'>{range_short}</a>"
-            info_text += f"<p><strong>Label:</strong> {label}</p>\n"
             info_text += f"<p><strong>Domain:</strong> {domain_short}</p>\n"
             info_text += f"<p><strong>Range:</strong> {range_short}</p>\n"
         self.info.setHtml(info_text)
     
     def search_ontology(self):
+        self.search_timer.stop()
+        self.search_popup.hide()
         search_text = self.search_bar.text().strip().lower()
-        if not search_text:
+        allowed_uris = self.search_filter_uris()
+        if not search_text and allowed_uris is None:
             return
         
         results = []
         
         # Search classes
         for class_short, class_uri in self.class_uri_map.items():
-            if search_text in class_short.lower():
+            if search_text in class_short.lower() and allowed_uris is None:
                 results.append((class_short, class_uri))
         
         # Search properties
         for property_short, property_uri in self.property_uri_map.items():
-            if search_text in property_short.lower():
+            if search_text in property_short.lower() and allowed_uris is None:
                 results.append((property_short, property_uri))
         
         # Search instances
@@ -442,6 +985,8 @@ class OntologyViewer(QMainWindow):
         for row in self.graph.query(query):
             instance_uri = str(row[0])
             instance_short = self.extract_last_part(instance_uri)
+            if allowed_uris is not None and instance_uri not in allowed_uris:
+                continue
             if search_text in instance_short.lower():
                 results.append((instance_short, instance_uri))
             
@@ -455,6 +1000,82 @@ class OntologyViewer(QMainWindow):
         else:
             self.info.setHtml("<h2>No results found</h2>")
     
+    def on_search_text_edited(self, text):
+        self.search_generation += 1
+        for worker in self.search_workers:
+            worker.cancel()
+        if text.strip() or self.date_range():
+            self.search_timer.start()
+        else:
+            self.search_timer.stop()
+            self.search_popup.hide()
+    
+    def date_range(self):
+        # (start, end) day numbers from the date filter inputs, None when both are empty or unparseable
+        start = parse_date(self.date_from_input.text()) if self.date_from_input.isEnabled() else None
+        end = parse_date(self.date_to_input.text(), end=True) if self.date_to_input.isEnabled() else None
+        if start is None and end is None:
+            return None
+        return (OPEN_BEGIN if start is None else start, OPEN_END if end is None else end)
+    
+    def class_filter_uris(self):
+        class_filter = self.search_class_combo.currentData()
+        if not class_filter:
+            return None
+        # Instances of the class including all of its subclasses
+        return {str(uri) for uri in self.type_index.instances_of(class_filter, self.class_closure)}
+    
+    def dated_events(self):
+        date_range = self.date_range()
+        if not date_range:
+            return None
+        return self.temporal_index.dated_entities(*date_range, contained=self.date_mode_combo.currentData())
+    
+    def search_filter_uris(self):
+        allowed_uris = self.class_filter_uris()
+        date_range = self.date_range()
+        if date_range:
+            dated = self.temporal_index.matching_instances(self.graph, *date_range, contained=self.date_mode_combo.currentData())
+            dated = {str(uri) for uri in dated}
+            allowed_uris = dated if allowed_uris is None else allowed_uris & dated
+        return allowed_uris
+    
+    def start_incremental_search(self):
+        search_text = self.search_bar.text().strip().lower()
+        allowed_uris = self.class_filter_uris()
+        # Only the index lookup happens here; the worker expands the events to linked instances
+        dated_events = self.dated_events()
+        if not search_text and allowed_uris is None and dated_events is None:
+            return
+        worker = SearchWorker(self.search_generation, search_text, self.snapshot(), self.search_index,
+                              self.class_uri_map, self.property_uri_map, self.extract_last_part, allowed_uris,
+                              dated_events, self.temporal_index)
+        worker.epoch = self.search_index_epoch
+        worker.index_ready.connect(self.on_search_index_ready)
+        worker.results_ready.connect(self.on_search_results_ready)
+        worker.finished.connect(lambda: self.search_workers.remove(worker))
+        self.search_workers.append(worker)
+        worker.start()
+    
+    def on_search_index_ready(self, index):
+        if self.sender().epoch == self.search_index_epoch:
+            self.search_index = index
+    
+    def on_search_results_ready(self, generation, results):
+        if generation != self.search_generation:
+            return  # Results for text that has since changed
+        self.search_results_model.set_results(results)
+        if not results:
+            self.search_popup.hide()
+            return
+        self.search_popup.move(self.search_bar.mapToGlobal(self.search_bar.rect().bottomLeft()))
+        self.search_popup.resize(self.search_bar.width(), 240)
+        self.search_popup.show()
+    
+    def on_search_result_clicked(self, index):
+        self.search_popup.hide()
+        self.on_anchor_clicked(QUrl(index.data(Qt.UserRole)))
+    
     def on_anchor_clicked(self, url):
         uri = url.toString()
         print(f"Clicked URI: {uri}")  # Debugging statement
@@ -468,14 +1089,35 @@ class OntologyViewer(QMainWindow):
             self.tabs.setCurrentWidget(self.object_properties_tree)  # Switch to Object Properties tab
         else:
             self.display_instance_info(uri)
+            self.reveal_instance(uri)
             self.expand_tree_item(self.populated_tree, uri)
             self.tabs.setCurrentWidget(self.populated_tree)  # Switch to Populated Ontology tab
     
+    def reveal_instance(self, instance_uri):
+        # Instances are listed a page at a time; one not paged in yet is shown
+        # on its own above "Load more..." until its page is loaded
+        for class_uri in self.graph.objects(rdflib.URIRef(instance_uri), rdflib.RDF.type):
+            for class_item in self.populated_items.get(str(class_uri), []):
+                if id(class_item) not in self.instance_pages:
+                    continue
+                if self.instance_pages[id(class_item)] is None:
+                    self.load_instance_page(class_item)
+                state = self.instance_pages[id(class_item)]
+                if instance_uri in state["uris"] or state["more"] is None:
+                    return
+                instance_item = self.make_item(instance_uri)
+                self.register_item(self.populated_items, instance_item)
+                class_item.insertChild(class_item.indexOfChild(state["more"]), instance_item)
+                state["items"].append(instance_item)
+                state["uris"].add(instance_uri)
+                state["revealed"][instance_uri] = instance_item
+                return
+    
     def expand_tree_item(self, tree, uri):
         iterator = QTreeWidgetItemIterator(tree)
         while iterator.value():
             item = iterator.value()
-            if item.text(0) == self.extract_last_part(uri):
+            if item.data(0, Qt.UserRole) == uri:
                 tree.setCurrentItem(item)
                 item.setSelected(True)
                 tree.scrollToItem(item)
@@ -489,37 +1131,36 @@ class OntologyViewer(QMainWindow):
         self.object_properties_tree.clear()
         self.property_uri_map.clear()
         query = f"""
-        SELECT ?property ?label ?domain ?range WHERE {{
+        SELECT ?property ?domain ?range WHERE {{
             {{ ?property rdfs:domain <{selected_class}> . }}
             UNION
             {{ ?property rdfs:range <{selected_class}> . }}
-            OPTIONAL {{ ?property rdfs:label ?label . }}
             OPTIONAL {{ ?property rdfs:domain ?domain . }}
             OPTIONAL {{ ?property rdfs:range ?range . }}
-            FILTER (lang(?label) = 'en' || lang(?label) = '')
         }}
         """
         property_hierarchy = {}
         for row in self.graph.query(query):
             property = str(row[0])
-            label = str(row[1]) if row[1] else ""
-            domain = str(row[2]) if row[2] else ""
-            range_ = str(row[3]) if row[3] else ""
+            domain = str(row[1]) if row[1] else ""
+            range_ = str(row[2]) if row[2] else ""
             property_short = self.extract_last_part(property)
             self.property_uri_map[property_short] = property
             self.property_uri_map[property] = property  # Add full URI to map
-            property_hierarchy[property_short] = (label, domain, range_)
+            property_hierarchy[property_short] = (domain, range_)
         
-        for property, (label, domain, range_) in property_hierarchy.items():
-            property_item = QTreeWidgetItem([property])
+        self.label_service.resolve_many(self.property_uri_map.values())
+        for property, (domain, range_) in property_hierarchy.items():
+            label = self.label_service.label(self.property_uri_map[property])
+            property_item = self.make_item(self.property_uri_map[property])
             self.object_properties_tree.addTopLevelItem(property_item)
             
             if domain:
-                domain_item = QTreeWidgetItem([f"Domain: {self.extract_last_part(domain)}"])
+                domain_item = QTreeWidgetItem([f"Domain: {self.display_name(domain)}"])
                 property_item.addChild(domain_item)
             
             if range_:
-                range_item = QTreeWidgetItem([f"Range: {self.extract_last_part(range_)}"])
+                range_item = QTreeWidgetItem([f"Range: {self.display_name(range_)}"])
                 property_item.addChild(range_item)
             
             if label:
@@ -530,37 +1171,36 @@ class OntologyViewer(QMainWindow):
         self.object_properties_wizard_tree.clear()
         self.property_uri_map.clear()
         query = f"""
-        SELECT ?property ?label ?domain ?range WHERE {{
+        SELECT ?property ?domain ?range WHERE {{
             {{ ?property rdfs:domain <{selected_class}> . }}
             UNION
             {{ ?property rdfs:range <{selected_class}> . }}
-            OPTIONAL {{ ?property rdfs:label ?label . }}
             OPTIONAL {{ ?property rdfs:domain ?domain . }}
             OPTIONAL {{ ?property rdfs:range ?range . }}
-            FILTER (lang(?label) = 'en' || lang(?label) = '')
         }}
         """
         property_hierarchy = {}
         for row in self.graph.query(query):
             property = str(row[0])
-            label = str(row[1]) if row[1] else ""
-            domain = str(row[2]) if row[2] else ""
-            range_ = str(row[3]) if row[3] else ""
+            domain = str(row[1]) if row[1] else ""
+            range_ = str(row[2]) if row[2] else ""
             property_short = self.extract_last_part(property)
             self.property_uri_map[property_short] = property
             self.property_uri_map[property] = property  # Add full URI to map
-            property_hierarchy[property_short] = (label, domain, range_)
+            property_hierarchy[property_short] = (domain, range_)
         
-        for property, (label, domain, range_) in property_hierarchy.items():
-            property_item = QTreeWidgetItem([property])
+        self.label_service.resolve_many(self.property_uri_map.values())
+        for property, (domain, range_) in property_hierarchy.items():
+            label = self.label_service.label(self.property_uri_map[property])
+            property_item = self.make_item(self.property_uri_map[property])
             self.object_properties_wizard_tree.addTopLevelItem(property_item)
             
             if domain:
-                domain_item = QTreeWidgetItem([f"Domain: {self.extract_last_part(domain)}"])
+                domain_item = QTreeWidgetItem([f"Domain: {self.display_name(domain)}"])
                 property_item.addChild(domain_item)
             
             if range_:
-                range_item = QTreeWidgetItem([f"Range: {self.extract_last_part(range_)}"])
+                range_item = QTreeWidgetItem([f"Range: {self.display_name(range_)}"])
                 property_item.addChild(range_item)
             
             if label:
@@ -0,0 +1,75 @@
+import bz2
+import gzip
+import lzma
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import rdflib
+from rdflib.util import guess_format
+
+COMPRESSION = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+RDF_SUFFIXES = (".owl", ".rdf", ".xml", ".ttl", ".nt", ".n3", ".nq", ".trig", ".jsonld")
+
+
+def split_compression(path):
+    base, suffix = os.path.splitext(path)
+    if suffix.lower() in COMPRESSION:
+        return base, COMPRESSION[suffix.lower()]
+    return path, open
+
+
+def expand_paths(paths):
+    # Directories are searched recursively for (optionally compressed) RDF files
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, filenames in os.walk(path):
+                for filename in sorted(filenames):
+                    if split_compression(filename)[0].lower().endswith(RDF_SUFFIXES):
+                        files.append(os.path.join(root, filename))
+        else:
+            files.append(path)
+    return files
+
+
+def parse_file(path):
+    # Runs in a worker process; the parsed triples travel back as compressed N-Triples
+    try:
+        name, opener = split_compression(path)
+        graph = rdflib.Graph()
+        with opener(path, "rb") as source:
+            graph.parse(source=source, format=guess_format(name) or "xml")
+        data = zlib.compress(graph.serialize(format="nt", encoding="utf-8"), 1)
+        namespaces = [(prefix, str(namespace)) for prefix, namespace in graph.namespaces()]
+        return path, len(graph), data, namespaces, None
+    except Exception as e:
+        return path, 0, None, [], str(e)
+
+
+class ParallelImporter:
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+
+    def import_files(self, paths, target, progress=None, cancelled=None):
+        # Parses files in worker processes and merges them into target; returns the failed files.
+        # When cancelled() turns true, files not yet started are dropped and the rest are not merged.
+        files = expand_paths(paths)
+        errors = []
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(parse_file, path) for path in files]
+            for done, future in enumerate(as_completed(futures), 1):
+                if cancelled and cancelled():
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    break
+                path, count, data, namespaces, error = future.result()
+                if error is None:
+                    for prefix, namespace in namespaces:
+                        target.bind(prefix, namespace, override=False)
+                    target.parse(data=zlib.decompress(data).decode("utf-8"), format="nt")
+                    print(f"Imported {path} ({count} triples) [{done}/{len(files)}]")
+                else:
+                    errors.append((path, error))
+                    print(f"Error importing {path}: {error} [{done}/{len(files)}]")
+                if progress:
+                    progress(done, len(files), path, count, error)
+        return errors
@@ -1,18 +1,46 @@
+import numpy as np
 import rdflib
 
 class ReasoningEngine:
     def __init__(self, graph):
         self.graph = graph
     
-    def apply_reasoning(self):
-        # Example reasoning: infer types of individuals based on known properties
-        query = """
-        SELECT ?subject ?type WHERE {
-            ?subject rdf:type ?type .
-        }
-        """
-        for row in self.graph.query(query):
-            subject = row[0]
-            type_ = row[1]
-            self.graph.add((subject, rdflib.RDF.type, type_))
-            print(f"Inferred type {type_} for {subject}")
\ No newline at end of file
+    def apply_reasoning(self, class_closure=None, property_closure=None, type_index=None):
+        # RDFS subclass (rdfs9) and subproperty (rdfs7) entailment; returns only new triples
+        inferred = []
+        if class_closure is not None and type_index is not None:
+            inferred += self.infer_types(class_closure, type_index)
+        if property_closure is not None:
+            inferred += self.infer_super_properties(property_closure)
+        print(f"Inferred {len(inferred)} triples")
+        return inferred
+    
+    def infer_types(self, class_closure, type_index):
+        terms = type_index.terms
+        new_subjects = []
+        new_classes = []
+        for class_, subject_ids in type_index.grouped_by_class().items():
+            for ancestor in class_closure.ancestors(str(class_)):
+                new_subjects.append(subject_ids)
+                new_classes.append(np.full(len(subject_ids), terms.encode(rdflib.URIRef(ancestor)), dtype=np.int64))
+        if not new_subjects:
+            return []
+        subjects = np.concatenate(new_subjects)
+        classes = np.concatenate(new_classes)
+        width = len(terms)
+        keys = np.unique(subjects * width + classes)
+        existing = type_index.subjects * width + type_index.classes
+        keys = keys[~np.isin(keys, existing)]
+        return [(terms.decode(key // width), rdflib.RDF.type, terms.decode(key % width)) for key in keys.tolist()]
+    
+    def infer_super_properties(self, property_closure):
+        inferred = []
+        for property in property_closure.nodes:
+            ancestors = [rdflib.URIRef(a) for a in property_closure.ancestors(property)]
+            if not ancestors:
+                continue
+            for subject, object_ in self.graph.subject_objects(rdflib.URIRef(property)):
+                for ancestor in ancestors:
+                    if (subject, ancestor, object_) not in self.graph:
+                        inferred.append((subject, ancestor, object_))
+        return list(dict.fromkeys(inferred))
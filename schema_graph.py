@@ -0,0 +1,115 @@
+from collections import deque
+import rdflib
+from hierarchy_closure import HierarchyClosure
+
+CLASS_TYPES = [rdflib.RDFS.Class, rdflib.OWL.Class]
+PROPERTY_TYPES = [rdflib.RDF.Property, rdflib.OWL.ObjectProperty, rdflib.OWL.DatatypeProperty]
+
+
+class SchemaGraph:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.classes = set()
+        self.properties = set()
+        self.class_parents = {}
+        self.property_parents = {}
+        self.domains = {}
+        self.ranges = {}
+        self.class_closure = HierarchyClosure({})
+        self.property_closure = HierarchyClosure({})
+        self.outgoing = {}
+        self.incoming = {}
+
+    def build(self, graph):
+        self.clear()
+        for class_type in CLASS_TYPES:
+            self.classes.update(str(c) for c in graph.subjects(rdflib.RDF.type, class_type) if isinstance(c, rdflib.URIRef))
+        for property_type in PROPERTY_TYPES:
+            self.properties.update(str(p) for p in graph.subjects(rdflib.RDF.type, property_type) if isinstance(p, rdflib.URIRef))
+        for child, parent in graph.subject_objects(rdflib.RDFS.subClassOf):
+            if isinstance(child, rdflib.URIRef) and isinstance(parent, rdflib.URIRef):
+                self.class_parents.setdefault(str(child), set()).add(str(parent))
+                self.classes.update((str(child), str(parent)))
+        for child, parent in graph.subject_objects(rdflib.RDFS.subPropertyOf):
+            if isinstance(child, rdflib.URIRef) and isinstance(parent, rdflib.URIRef):
+                self.property_parents.setdefault(str(child), set()).add(str(parent))
+                self.properties.update((str(child), str(parent)))
+        for predicate, target in ((rdflib.RDFS.domain, self.domains), (rdflib.RDFS.range, self.ranges)):
+            for property, class_ in graph.subject_objects(predicate):
+                if isinstance(class_, rdflib.URIRef):
+                    target.setdefault(str(property), set()).add(str(class_))
+                    self.properties.add(str(property))
+
+        self.class_closure = HierarchyClosure(self.class_parents, self.classes)
+        self.property_closure = HierarchyClosure(self.property_parents, self.properties)
+
+        # Sub-properties without their own domain or range inherit their parents'
+        for declared in (self.domains, self.ranges):
+            for property in self.properties:
+                if property not in declared:
+                    inherited = set()
+                    for parent in self.property_closure.ancestors(property):
+                        inherited |= declared.get(parent, set())
+                    if inherited:
+                        declared[property] = inherited
+
+        declared_for = {}
+        for declared, index in ((self.domains, self.outgoing), (self.ranges, self.incoming)):
+            declared_for.clear()
+            for property, classes in declared.items():
+                for class_ in classes:
+                    declared_for.setdefault(class_, set()).add(property)
+            for class_ in self.classes:
+                properties = set()
+                for ancestor in self.class_closure.ancestors(class_, include_self=True):
+                    properties |= declared_for.get(ancestor, set())
+                index[class_] = properties
+        print(f"Schema graph: {len(self.classes)} classes, {len(self.properties)} properties")
+
+    def uses(self, triple):
+        # Whether build() reads this triple; blank-node axioms (restrictions, unions) don't change the schema graph
+        subject, predicate, object_ = triple
+        if predicate in (rdflib.RDFS.subClassOf, rdflib.RDFS.subPropertyOf):
+            return isinstance(subject, rdflib.URIRef) and isinstance(object_, rdflib.URIRef)
+        if predicate in (rdflib.RDFS.domain, rdflib.RDFS.range):
+            return isinstance(object_, rdflib.URIRef)
+        if predicate == rdflib.RDF.type:
+            return isinstance(subject, rdflib.URIRef) and object_ in CLASS_TYPES + PROPERTY_TYPES
+        return False
+
+    def applicable_properties(self, class_uri):
+        return self.outgoing.get(class_uri, set()) | self.incoming.get(class_uri, set())
+
+    def property_classes(self, property_uri):
+        return self.domains.get(property_uri, set()) | self.ranges.get(property_uri, set())
+
+    def is_subclass(self, class_uri, superclass_uri):
+        return self.class_closure.is_a(class_uri, superclass_uri)
+
+    def shortest_path(self, source, target, max_hops=6):
+        # Breadth-first search over (class) -[property]-> (range class) hops
+        if source == target:
+            return []
+        previous = {source: None}
+        frontier = deque([(source, 0)])
+        while frontier:
+            current, hops = frontier.popleft()
+            if hops >= max_hops:
+                continue
+            for property in sorted(self.outgoing.get(current, ())):
+                for next_class in sorted(self.ranges.get(property, ())):
+                    if next_class in previous:
+                        continue
+                    previous[next_class] = (current, property)
+                    if self.is_subclass(next_class, target):
+                        path = []
+                        node = next_class
+                        while previous[node]:
+                            parent, via = previous[node]
+                            path.append((parent, via, node))
+                            node = parent
+                        return list(reversed(path))
+                    frontier.append((next_class, hops + 1))
+        return None
@@ -0,0 +1,108 @@
+import heapq
+import threading
+from PyQt5.QtCore import Qt, QThread, QAbstractListModel, QModelIndex, pyqtSignal
+import rdflib
+
+
+class SearchCancelled(Exception):
+    pass
+
+
+class SearchWorker(QThread):
+    index_ready = pyqtSignal(list)
+    results_ready = pyqtSignal(int, list)
+
+    def __init__(self, generation, search_text, graph, index, class_uri_map, property_uri_map, extract_last_part, allowed_uris=None,
+                 dated_events=None, temporal_index=None, limit=50):
+        super().__init__()
+        self.generation = generation
+        self.search_text = search_text
+        self.graph = graph
+        self.index = index
+        # Copies, so the GUI thread can keep rebuilding its maps while we run
+        self.class_uri_map = dict(class_uri_map)
+        self.property_uri_map = dict(property_uri_map)
+        self.extract_last_part = extract_last_part
+        self.allowed_uris = allowed_uris
+        self.dated_events = dated_events
+        self.temporal_index = temporal_index
+        self.limit = limit
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            if self.index is None:
+                self.index = self.build_index()
+                self.index_ready.emit(self.index)
+            if self.dated_events is not None:
+                dated = self.dated_instances()
+                self.allowed_uris = dated if self.allowed_uris is None else self.allowed_uris & dated
+            results = heapq.nsmallest(self.limit, self.matches())
+            self.results_ready.emit(self.generation, [(short, uri) for _, _, short, uri in results])
+        except SearchCancelled:
+            pass
+
+    def build_index(self):
+        index = []
+        seen = set()
+        for short, uri in list(self.class_uri_map.items()) + list(self.property_uri_map.items()):
+            if uri not in seen:
+                seen.add(uri)
+                index.append((short.lower(), short, uri))
+        for i, instance in enumerate(self.graph.subjects(rdflib.RDF.type)):
+            if i % 4096 == 0 and self.cancel_event.is_set():
+                raise SearchCancelled()
+            uri = str(instance)
+            if uri not in seen:
+                seen.add(uri)
+                short = self.extract_last_part(uri)
+                index.append((short.lower(), short, uri))
+        return index
+
+    def dated_instances(self):
+        # The date filter's events plus what they are linked to, expanded here rather than on the GUI thread
+        instances = set()
+        for i, event in enumerate(self.dated_events):
+            if i % 1024 == 0 and self.cancel_event.is_set():
+                raise SearchCancelled()
+            instances.add(str(event))
+            instances.update(str(uri) for uri in self.temporal_index.linked_instances(self.graph, event))
+        return instances
+
+    def matches(self):
+        for i, (short_lower, short, uri) in enumerate(self.index):
+            if i % 4096 == 0 and self.cancel_event.is_set():
+                raise SearchCancelled()
+            if self.allowed_uris is not None and uri not in self.allowed_uris:
+                continue
+            position = short_lower.find(self.search_text)
+            if position >= 0:
+                # Prefix matches first, then shorter names
+                yield (0 if position == 0 else 1, len(short), short, uri)
+
+
+class SearchResultsModel(QAbstractListModel):
+    def __init__(self):
+        super().__init__()
+        self.results = []
+
+    def set_results(self, results):
+        self.beginResetModel()
+        self.results = results
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.results)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        short, uri = self.results[index.row()]
+        if role == Qt.DisplayRole:
+            return short
+        if role == Qt.ToolTipRole or role == Qt.UserRole:
+            return uri
+        return None
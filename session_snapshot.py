@@ -0,0 +1,364 @@
+import base64
+import io
+import json
+import os
+import numpy as np
+import rdflib
+from PyQt5.QtCore import Qt, QThread, QByteArray, pyqtSignal
+from PyQt5.QtWidgets import QTreeWidgetItemIterator
+from parallel_import import expand_paths
+from lazy_rdfxml import LazyRdfXml
+
+SESSION_VERSION = 2
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".ontology_viewer", "session")
+# What a missing, truncated or corrupt cache file can raise while it is read and decoded
+CACHE_ERRORS = (OSError, EOFError, ValueError, KeyError, IndexError, TypeError)
+
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def stamp_valid(stamp):
+    try:
+        return file_stamp(stamp["path"]) == stamp
+    except OSError:
+        return False
+
+
+def source_valid(source):
+    if source["kind"] == "endpoint":
+        return True
+    if source["kind"] == "import":
+        files = sorted(os.path.abspath(path) for path in expand_paths(source["paths"]))
+        return files == sorted(stamp["path"] for stamp in source["files"]) and all(stamp_valid(stamp) for stamp in source["files"])
+    return stamp_valid(source["file"])
+
+
+def encode_triples(triples):
+    # A term table of plain str/int tuples plus an (n, 3) array of term ids. Both
+    # are stored without pickle (JSON and .npy), so reading the cache can't run code.
+    ids = {}
+    rows = [ids.setdefault(term, len(ids)) for triple in triples for term in triple]
+    rows = np.array(rows, dtype=np.int64).reshape(-1, 3)
+    terms = []
+    for term in ids:
+        if isinstance(term, rdflib.Literal):
+            terms.append((2, str(term), term.language, str(term.datatype) if term.datatype else None))
+        elif isinstance(term, rdflib.BNode):
+            terms.append((1, str(term)))
+        else:
+            terms.append((0, str(term)))
+    return terms, rows
+
+
+def decode_triples(encoded):
+    terms, rows = encoded
+    datatypes = {}
+    decoded = []
+    for term in terms:
+        if term[0] == 0:
+            decoded.append(rdflib.URIRef(term[1]))
+        elif term[0] == 1:
+            decoded.append(rdflib.BNode(term[1]))
+        else:
+            datatype = datatypes.setdefault(term[3], rdflib.URIRef(term[3])) if term[3] else None
+            decoded.append(rdflib.Literal(term[1], lang=term[2], datatype=datatype))
+    return [(decoded[s], decoded[p], decoded[o]) for s, p, o in rows.tolist()]
+
+
+def read_triples(path):
+    with open(path + ".json", encoding="utf-8") as f:
+        terms = json.load(f)
+    return decode_triples((terms, np.load(path + ".npy", allow_pickle=False)))
+
+
+class SessionRestoreWorker(QThread):
+    restored = pyqtSignal()
+    restore_failed = pyqtSignal(str)
+
+    def __init__(self, data_path, change_bus):
+        super().__init__()
+        self.data_path = data_path
+        self.change_bus = change_bus
+
+    def run(self):
+        try:
+            triples = read_triples(self.data_path)
+        except CACHE_ERRORS as e:
+            self.restore_failed.emit(str(e))
+            return
+        # Committed from this thread; the GUI gets the diff queued and stays responsive
+        self.change_bus.apply(triples, [])
+        self.restored.emit()
+
+
+class SessionSnapshot:
+    # Saves the loaded sources, the graph, the search index and the view state
+    # on exit. On the next start the schema part of the graph and the view come
+    # back straight away and the instance data follows on a worker thread. The
+    # cached graph is only used while every source file is unchanged;
+    # otherwise the sources are loaded again and the in-app edits, which are
+    # saved separately, are re-applied on top of them.
+
+    def __init__(self, ontology_viewer, directory=DEFAULT_DIRECTORY):
+        self.ontology_viewer = ontology_viewer
+        self.directory = directory
+        self.state_path = os.path.join(directory, "session.json")
+        # Triple sets are stored as <path>.json (term table) and <path>.npy (rows)
+        self.schema_path = os.path.join(directory, "schema")
+        self.data_path = os.path.join(directory, "data")
+        self.index_path = os.path.join(directory, "indexes.json")
+        self.added_path = os.path.join(directory, "edits-added")
+        self.removed_path = os.path.join(directory, "edits-removed")
+        self.saved_version = None
+        self.worker = None
+
+    def trees(self):
+        viewer = self.ontology_viewer
+        return {
+            "classes": viewer.tree,
+            "properties": viewer.object_properties_tree,
+            "wizard": viewer.object_properties_wizard_tree,
+            "populated": viewer.populated_tree,
+        }
+
+    def write(self, path, data):
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+    def write_triples(self, path, triples):
+        terms, rows = encode_triples(triples)
+        buffer = io.BytesIO()
+        np.save(buffer, rows, allow_pickle=False)
+        self.write(path + ".npy", buffer.getvalue())
+        self.write(path + ".json", json.dumps(terms).encode("utf-8"))
+
+    def cached(self, path):
+        return os.path.exists(path + ".json") and os.path.exists(path + ".npy")
+
+    def save(self):
+        if self.worker:
+            return  # Still restoring; the previous snapshot is still the right one
+        viewer = self.ontology_viewer
+        state = {
+            "version": SESSION_VERSION,
+            "sources": viewer.sources,
+            "lazy_loaded": {source.path: sorted(source.loaded) for source in viewer.lazy_sources},
+            "namespaces": [(prefix, str(namespace)) for prefix, namespace in viewer.graph.namespaces()],
+            "view": self.capture_view_state(),
+            "cached": viewer.versioned(),
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if viewer.versioned():
+                self.save_graph()
+            self.write(self.state_path, json.dumps(state).encode("utf-8"))
+            print(f"Session saved to {self.directory}")
+        except OSError as e:
+            print(f"Error saving session: {e}")
+
+    def save_graph(self):
+        viewer = self.ontology_viewer
+        version = viewer.graph.store.current.number
+        if version == self.saved_version and self.cached(self.data_path) and self.cached(self.added_path):
+            return  # Unchanged since it was restored or last saved
+        snapshot = viewer.snapshot()
+        # Instances of domain classes go to the data part; the rest (classes, properties, headers) is small
+        classes = viewer.schema_graph.classes
+        instances = {s for s, c in snapshot.subject_objects(rdflib.RDF.type) if str(c) in classes}
+        schema_triples = []
+        data_triples = []
+        for triple in snapshot:
+            (data_triples if triple[0] in instances else schema_triples).append(triple)
+        self.write_triples(self.schema_path, schema_triples)
+        self.write_triples(self.data_path, data_triples)
+        # The type and temporal indexes fill from the restored triples as they go
+        # through the change bus, and the closures are compiled from the schema
+        # part, so only the search index is worth keeping
+        self.write(self.index_path, json.dumps({"search_index": viewer.search_index}).encode("utf-8"))
+        self.write_triples(self.added_path, [triple for triple, present in viewer.edits.items() if present])
+        self.write_triples(self.removed_path, [triple for triple, present in viewer.edits.items() if not present])
+        self.saved_version = version
+
+    def read_state(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return state if state.get("version") == SESSION_VERSION else None
+
+    def read_edits(self):
+        try:
+            added, removed = read_triples(self.added_path), read_triples(self.removed_path)
+        except FileNotFoundError:
+            return {}
+        except CACHE_ERRORS as e:
+            print(f"Error reading session edits: {e}")
+            return {}
+        return {**dict.fromkeys(removed, False), **dict.fromkeys(added, True)}
+
+    def restore(self):
+        state = self.read_state()
+        if state is None:
+            return False
+        viewer = self.ontology_viewer
+        view = state["view"]
+        viewer.label_languages_input.setText(view["label_languages"])
+        viewer.on_label_languages_changed()
+        if view.get("geometry"):
+            viewer.restoreGeometry(QByteArray(base64.b64decode(view["geometry"])))
+        for prefix, namespace in state["namespaces"]:
+            viewer.graph.bind(prefix, namespace, override=False)
+        sources = state["sources"]
+        cached = state["cached"] and self.cached(self.schema_path) and self.cached(self.data_path) and os.path.exists(self.index_path)
+        if cached and all(source_valid(source) for source in sources):
+            try:
+                self.restore_cached(state)
+                return True
+            except CACHE_ERRORS as e:
+                print(f"Error reading session cache: {e}")
+        self.reload_sources(sources)
+        self.apply_view_state(view)
+        return True
+
+    def restore_cached(self, state):
+        viewer = self.ontology_viewer
+        viewer.change_bus.add_many(read_triples(self.schema_path))
+        # The cached graph already has the edits; keep them so the next save still has them
+        viewer.edits = self.read_edits()
+        viewer.sources = state["sources"]
+        for source in state["sources"]:
+            if source["kind"] == "lazy":
+                lazy_source = LazyRdfXml(source["file"]["path"])
+                lazy_source.loaded.update(state["lazy_loaded"].get(lazy_source.path, []))
+                viewer.lazy_sources.append(lazy_source)
+        self.apply_view_state(state["view"])
+        self.worker = SessionRestoreWorker(self.data_path, viewer.change_bus)
+        self.worker.restored.connect(lambda: self.on_restored(state["view"]))
+        self.worker.restore_failed.connect(lambda error: self.on_restore_failed(error, state["view"]))
+        self.worker.start()
+        print(f"Restored session schema from {self.directory}; loading instance data")
+
+    def on_restored(self, view):
+        viewer = self.ontology_viewer
+        self.worker.wait()
+        self.worker = None
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                search_index = json.load(f)["search_index"]
+        except CACHE_ERRORS as e:
+            print(f"Error reading session search index: {e}")
+            search_index = None  # Rebuilt on the next search
+        if search_index is not None:
+            viewer.search_index = [tuple(entry) for entry in search_index]
+        # Instances are only listed now, and a large diff rebuilds the trees, so expand again
+        self.apply_tree_state(view)
+        self.saved_version = viewer.graph.store.current.number if viewer.versioned() else None
+        print("Session restored")
+
+    def on_restore_failed(self, error, view):
+        self.worker.wait()
+        self.worker = None
+        print(f"Error reading session cache: {error}")
+        self.reload_sources(self.ontology_viewer.sources)
+        self.apply_tree_state(view)
+
+    def reload_sources(self, sources):
+        print("Loading the session's sources again")
+        viewer = self.ontology_viewer
+        # Loading registers each source again
+        viewer.sources = []
+        viewer.lazy_sources = []
+        for source in sources:
+            try:
+                if source["kind"] == "endpoint":
+                    viewer.connect_endpoint(source["url"], source["update_url"])
+                elif source["kind"] == "import":
+                    viewer.import_files(source["paths"])
+                elif source["kind"] == "lazy":
+                    viewer.load_ontology_lazily(source["file"]["path"])
+                else:
+                    viewer.load_ontology(source["file"]["path"])
+            except Exception as e:
+                print(f"Error reloading {source}: {e}")
+        self.replay_edits(self.read_edits())
+
+    def replay_edits(self, edits):
+        viewer = self.ontology_viewer
+        if not edits:
+            return
+        if viewer.import_worker:
+            # The import is committed when it finishes; the edits go on top of it
+            viewer.import_worker.import_finished.connect(lambda loaded, errors: self.replay_edits(edits))
+            return
+        print(f"Re-applying {len(edits)} in-app edits to the reloaded sources")
+        with viewer.change_bus.transaction():
+            viewer.remove_triples([triple for triple, present in edits.items() if not present])
+            viewer.add_triples([triple for triple, present in edits.items() if present])
+
+    def capture_view_state(self):
+        viewer = self.ontology_viewer
+        view = {
+            "tab": viewer.tabs.currentIndex(),
+            "expanded": {},
+            "selected": {},
+            "search_text": viewer.search_bar.text(),
+            "search_class": viewer.search_class_combo.currentData(),
+            "date_from": viewer.date_from_input.text(),
+            "date_to": viewer.date_to_input.text(),
+            "date_mode": viewer.date_mode_combo.currentIndex(),
+            "label_languages": viewer.label_languages_input.text(),
+            "info_html": viewer.info.toHtml(),
+            "geometry": base64.b64encode(bytes(viewer.saveGeometry())).decode("ascii"),
+        }
+        for name, tree in self.trees().items():
+            expanded = []
+            selected = []
+            iterator = QTreeWidgetItemIterator(tree)
+            while iterator.value():
+                item = iterator.value()
+                uri = item.data(0, Qt.UserRole)
+                if uri and item.isExpanded():
+                    expanded.append(uri)
+                if uri and item.isSelected():
+                    selected.append(uri)
+                iterator += 1
+            view["expanded"][name] = expanded
+            view["selected"][name] = selected
+        return view
+
+    def apply_view_state(self, view):
+        viewer = self.ontology_viewer
+        self.apply_tree_state(view)
+        viewer.tabs.setCurrentIndex(view["tab"])
+        widgets = (viewer.search_class_combo, viewer.date_mode_combo)
+        for widget in widgets:
+            widget.blockSignals(True)
+        viewer.search_bar.setText(view["search_text"])
+        viewer.search_class_combo.setCurrentIndex(max(0, viewer.search_class_combo.findData(view["search_class"])))
+        viewer.date_from_input.setText(view["date_from"])
+        viewer.date_to_input.setText(view["date_to"])
+        viewer.date_mode_combo.setCurrentIndex(view["date_mode"])
+        for widget in widgets:
+            widget.blockSignals(False)
+        viewer.info.setHtml(view["info_html"])
+
+    def apply_tree_state(self, view):
+        for name, tree in self.trees().items():
+            expanded = set(view["expanded"].get(name, ()))
+            selected = set(view["selected"].get(name, ()))
+            # Expanding a populated class adds its instances, which the iterator then visits too
+            iterator = QTreeWidgetItemIterator(tree)
+            while iterator.value():
+                item = iterator.value()
+                uri = item.data(0, Qt.UserRole)
+                if uri in expanded:
+                    item.setExpanded(True)
+                if uri in selected:
+                    item.setSelected(True)
+                    tree.scrollToItem(item)
+                iterator += 1
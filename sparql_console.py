@@ -0,0 +1,340 @@
+import csv
+import threading
+import time
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QPushButton, QLabel, QSpinBox, QTableView, QFileDialog
+from PyQt5.QtCore import Qt, QThread, QAbstractTableModel, QModelIndex, pyqtSignal
+import rdflib
+from rdflib.store import Store
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.plugins.sparql.evaluate import evalQuery
+
+
+class QueryCancelled(Exception):
+    pass
+
+
+class QueryTimeout(Exception):
+    pass
+
+
+class GuardedStore(Store):
+    # Read-only pass-through that calls check() while the query engine pulls
+    # triples, so a cancel or timeout also interrupts queries that produce no
+    # rows until evaluation ends (ORDER BY, GROUP BY, DISTINCT, aggregates)
+
+    def __init__(self, graph, check, interval=1000):
+        super().__init__()
+        self.graph = graph
+        self.check = check
+        self.interval = interval
+
+    def triples(self, triple_pattern, context=None):
+        self.check()
+        for i, triple in enumerate(self.graph.triples(triple_pattern)):
+            if i % self.interval == 0:
+                self.check()
+            yield triple, iter(())
+
+    def __len__(self, context=None):
+        return len(self.graph)
+
+    def add(self, triple, context=None, quoted=False):
+        raise TypeError("Query graphs are read-only")
+
+    def remove(self, triple_pattern, context=None):
+        raise TypeError("Query graphs are read-only")
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def bind(self, prefix, namespace, override=True):
+        pass
+
+    def namespace(self, prefix):
+        return self.graph.store.namespace(prefix)
+
+    def prefix(self, namespace):
+        return self.graph.store.prefix(namespace)
+
+    def namespaces(self):
+        return self.graph.namespaces()
+
+
+def guarded(graph, check):
+    # Endpoint graphs evaluate remotely and enforce their own timeouts
+    if hasattr(graph, "stream_query"):
+        return graph
+    return rdflib.Graph(store=GuardedStore(graph, check))
+
+
+def stream_query(graph, query_text):
+    if hasattr(graph, "stream_query"):
+        return graph.stream_query(query_text)
+    # Evaluate without going through rdflib's Result, which keeps every row it yields
+    query = prepareQuery(query_text, initNs=dict(graph.namespaces()))
+    res = evalQuery(graph, query, {})
+    type_ = res.get("type_")
+    if type_ == "SELECT":
+        variables = res["vars_"]
+        # A solution that binds none of the variables (e.g. only OPTIONALs) is still a row
+        rows = ([b.get(v) for v in variables] for b in res["bindings"])
+        return [str(v) for v in variables], rows
+    if type_ == "ASK":
+        return ["ask"], iter([[res["askAnswer"]]])
+    return ["subject", "predicate", "object"], (list(t) for t in res["graph"])
+
+
+class QueryWorker(QThread):
+    page_ready = pyqtSignal(list, list)
+    query_finished = pyqtSignal(int, float)
+    query_failed = pyqtSignal(str)
+
+    def __init__(self, graph, query_text, timeout, page_size=500, export_path=None):
+        super().__init__()
+        self.graph = graph
+        self.query_text = query_text
+        self.timeout = timeout
+        self.page_size = page_size
+        self.export_path = export_path
+        self.cancel_event = threading.Event()
+        self.more_event = threading.Event()
+        self.more_event.set()
+        self.elapsed = 0.0
+        self.started = 0.0
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.more_event.set()
+
+    def fetch_more(self):
+        self.more_event.set()
+
+    def check(self):
+        if self.cancel_event.is_set():
+            raise QueryCancelled()
+        if self.timeout and self.elapsed + time.perf_counter() - self.started > self.timeout:
+            raise QueryTimeout()
+
+    def run(self):
+        self.started = time.perf_counter()
+        count = 0
+        try:
+            columns, rows = stream_query(guarded(self.graph, self.check), self.query_text)
+            if self.export_path:
+                count = self.export_rows(columns, rows)
+            else:
+                count = self.page_rows(columns, rows)
+            self.elapsed += time.perf_counter() - self.started
+            self.query_finished.emit(count, self.elapsed)
+        except QueryCancelled:
+            self.query_failed.emit("Query cancelled")
+        except QueryTimeout:
+            self.query_failed.emit(f"Query timed out after {self.timeout} s")
+        except Exception as e:
+            self.query_failed.emit(f"Error executing query: {e}")
+
+    def page_rows(self, columns, rows):
+        count = 0
+        page = []
+        for row in rows:
+            self.check()
+            page.append(row)
+            count += 1
+            if len(page) >= self.page_size:
+                self.page_ready.emit(columns, page)
+                page = []
+                # Only the paused time is excluded from the timeout budget
+                self.elapsed += time.perf_counter() - self.started
+                self.more_event.clear()
+                self.more_event.wait()
+                self.started = time.perf_counter()
+                self.check()
+        self.page_ready.emit(columns, page)
+        return count
+
+    def export_rows(self, columns, rows):
+        delimiter = "\t" if self.export_path.endswith(".tsv") else ","
+        count = 0
+        with open(self.export_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, delimiter=delimiter)
+            writer.writerow(columns)
+            for row in rows:
+                self.check()
+                writer.writerow(["" if value is None else str(value) for value in row])
+                count += 1
+        return count
+
+
+class ResultTableModel(QAbstractTableModel):
+    more_requested = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self.columns = []
+        self.rows = []
+        self.exhausted = True
+        self.waiting = False
+
+    def reset(self):
+        self.beginResetModel()
+        self.columns = []
+        self.rows = []
+        self.exhausted = False
+        self.waiting = True
+        self.endResetModel()
+
+    def append_page(self, columns, page):
+        if not self.columns:
+            self.beginResetModel()
+            self.columns = columns
+            self.endResetModel()
+        if page:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+            self.rows.extend(page)
+            self.endInsertRows()
+        self.waiting = False
+
+    def finish(self):
+        self.exhausted = True
+        self.waiting = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            value = self.rows[index.row()][index.column()]
+            return "" if value is None else str(value)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and section < len(self.columns):
+            return self.columns[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted and not self.waiting
+
+    def fetchMore(self, parent=QModelIndex()):
+        self.waiting = True
+        self.more_requested.emit()
+
+
+class SparqlConsole(QWidget):
+    def __init__(self, ontology_viewer):
+        super().__init__()
+        self.ontology_viewer = ontology_viewer
+        self.worker = None
+        self.export_worker = None
+        self.retired_workers = []
+
+        self.layout = QVBoxLayout()
+        self.setLayout(self.layout)
+
+        self.query_input = QPlainTextEdit()
+        self.query_input.setPlainText("SELECT ?s ?p ?o WHERE {\n    ?s ?p ?o .\n}")
+
+        self.timeout_spin = QSpinBox()
+        self.timeout_spin.setRange(0, 3600)
+        self.timeout_spin.setValue(30)
+        self.timeout_spin.setSuffix(" s")
+        self.timeout_spin.setSpecialValueText("No timeout")
+
+        self.run_button = QPushButton("Run Query")
+        self.run_button.clicked.connect(self.run_query)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_query)
+        self.cancel_button.setEnabled(False)
+        self.export_button = QPushButton("Export CSV/TSV")
+        self.export_button.clicked.connect(self.export_results)
+
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("Timeout:"))
+        controls.addWidget(self.timeout_spin)
+        controls.addWidget(self.run_button)
+        controls.addWidget(self.cancel_button)
+        controls.addWidget(self.export_button)
+
+        self.results_model = ResultTableModel()
+        self.results_model.more_requested.connect(self.fetch_more)
+        self.results_view = QTableView()
+        self.results_view.setModel(self.results_model)
+
+        self.status_label = QLabel("")
+
+        self.layout.addWidget(self.query_input)
+        self.layout.addLayout(controls)
+        self.layout.addWidget(self.results_view)
+        self.layout.addWidget(self.status_label)
+
+    def run_query(self):
+        query_text = self.query_input.toPlainText().strip()
+        if not query_text:
+            return
+        self.cancel_query()
+        self.results_model.reset()
+        self.worker = QueryWorker(self.ontology_viewer.snapshot(), query_text, self.timeout_spin.value())
+        self.worker.page_ready.connect(self.results_model.append_page)
+        self.worker.query_finished.connect(self.on_query_finished)
+        self.worker.query_failed.connect(self.on_query_failed)
+        self.cancel_button.setEnabled(True)
+        self.status_label.setText("Running...")
+        self.worker.start()
+
+    def fetch_more(self):
+        if self.worker:
+            self.status_label.setText(f"Fetching rows after {len(self.results_model.rows)}...")
+            self.worker.fetch_more()
+
+    def cancel_query(self):
+        if self.worker:
+            # Keep a reference until the thread has actually wound down
+            worker = self.worker
+            worker.cancel()
+            self.retired_workers.append(worker)
+            worker.finished.connect(lambda: self.retired_workers.remove(worker))
+            self.worker = None
+        self.cancel_button.setEnabled(False)
+
+    def on_query_finished(self, count, elapsed):
+        if self.sender() is not self.worker:
+            return
+        self.results_model.finish()
+        self.cancel_button.setEnabled(False)
+        self.status_label.setText(f"{count} rows in {elapsed * 1000:.1f} ms")
+
+    def on_query_failed(self, message):
+        if self.sender() is not self.worker:
+            return
+        self.results_model.finish()
+        self.cancel_button.setEnabled(False)
+        self.status_label.setText(message)
+
+    def export_results(self):
+        query_text = self.query_input.toPlainText().strip()
+        if not query_text:
+            return
+        if self.export_worker and self.export_worker.isRunning():
+            self.status_label.setText("An export is still running")
+            return
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Results", "", "CSV files (*.csv);;TSV files (*.tsv)")
+        if file_path:
+            # The export re-runs the query and writes rows as they are produced
+            self.export_worker = QueryWorker(self.ontology_viewer.snapshot(), query_text, self.timeout_spin.value(), export_path=file_path)
+            self.export_worker.query_finished.connect(lambda count, elapsed: self.status_label.setText(f"Exported {count} rows to {file_path} in {elapsed * 1000:.1f} ms"))
+            self.export_worker.query_failed.connect(self.status_label.setText)
+            self.status_label.setText(f"Exporting to {file_path}...")
+            self.export_worker.start()
+
+    def shutdown(self):
+        # Called when the window closes; don't leave threads writing after it is gone
+        self.cancel_query()
+        if self.export_worker:
+            self.export_worker.cancel()
+            self.export_worker.wait()
+            self.export_worker = None
+        for worker in list(self.retired_workers):
+            worker.wait()
@@ -0,0 +1,347 @@
+import http.client
+import json
+import queue
+import re
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+import rdflib
+from rdflib.plugins.sparql import prepareQuery
+
+DEFAULT_PREFIXES = {
+    "rdf": str(rdflib.RDF),
+    "rdfs": str(rdflib.RDFS),
+    "owl": str(rdflib.OWL),
+    "xsd": str(rdflib.XSD),
+}
+
+
+def sparql_term(term):
+    if isinstance(term, rdflib.term.Node):
+        return term.n3()
+    return rdflib.URIRef(term).n3()
+
+
+def query_form(query_text):
+    # Strip prologue and comments to find the query form
+    stripped = re.sub(r"#[^\n]*|PREFIX\s+\w*:\s*<[^>]*>|BASE\s*<[^>]*>", "", query_text, flags=re.IGNORECASE)
+    match = re.match(r"\s*(SELECT|ASK|CONSTRUCT|DESCRIBE)", stripped, re.IGNORECASE)
+    return match.group(1).upper() if match else "SELECT"
+
+
+def values_query(graph, variable, values, pattern, select="*", batch_size=200):
+    # One query per batch of bindings instead of one query per value
+    values = list(values)
+    for start in range(0, len(values), batch_size):
+        batch = " ".join(sparql_term(value) for value in values[start:start + batch_size])
+        query = f"""
+        SELECT {select} WHERE {{
+            VALUES ?{variable} {{ {batch} }}
+            {pattern}
+        }}
+        """
+        for row in graph.query(query):
+            yield row
+
+
+class EndpointError(Exception):
+    pass
+
+
+class ResponseCache:
+    # LRU bounded by the total number of cached rows, since one entry can be a full page
+    def __init__(self, ttl=300, max_rows=200000):
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.rows = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, size, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                self.rows -= size
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, size=1):
+        size = max(size, 1)
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.rows -= previous[1]
+            if size > self.max_rows:
+                return  # Would evict everything else and still not fit
+            self.entries[key] = (time.monotonic() + self.ttl, size, value)
+            self.rows += size
+            while self.rows > self.max_rows:
+                _, (_, evicted, _) = self.entries.popitem(last=False)
+                self.rows -= evicted
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.rows = 0
+
+
+class ConnectionPool:
+    def __init__(self, url, size=4, timeout=60):
+        parsed = urllib.parse.urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.path = parsed.path or "/"
+        if parsed.query:
+            self.path += "?" + parsed.query
+        self.timeout = timeout
+        self.idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            return self.connection_class(self.host, self.port, timeout=self.timeout)
+
+    def release(self, connection):
+        try:
+            self.idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def post(self, body, content_type, accept):
+        headers = {"Content-Type": content_type, "Accept": accept, "Connection": "keep-alive"}
+        for attempt in range(2):
+            connection = self.acquire()
+            try:
+                connection.request("POST", self.path, body=body.encode("utf-8"), headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, OSError):
+                # Stale keep-alive connection; retry once on a fresh one
+                connection.close()
+                if attempt:
+                    raise
+                continue
+            if response.will_close:
+                connection.close()
+            else:
+                self.release(connection)
+            if response.status >= 400:
+                raise EndpointError(f"{response.status} {response.reason}: {data[:500].decode('utf-8', 'replace')}")
+            return data, response.getheader("Content-Type", "")
+
+
+class EndpointGraph:
+    def __init__(self, endpoint_url, update_url=None, page_size=10000, cache_ttl=300, pool_size=4, timeout=60):
+        self.endpoint_url = endpoint_url
+        self.update_url = update_url
+        self.page_size = page_size
+        self.pool = ConnectionPool(endpoint_url, pool_size, timeout)
+        self.update_pool = ConnectionPool(update_url, 1, timeout) if update_url else None
+        self.cache = ResponseCache(cache_ttl)
+        self.prefixes = dict(DEFAULT_PREFIXES)
+
+    def namespaces(self):
+        return iter((prefix, rdflib.URIRef(uri)) for prefix, uri in self.prefixes.items())
+
+    def bind(self, prefix, namespace, *args, **kwargs):
+        self.prefixes[prefix] = str(namespace)
+
+    def with_prefixes(self, query_text):
+        declared = set(re.findall(r"PREFIX\s+(\w*):", query_text, re.IGNORECASE))
+        header = "".join(f"PREFIX {prefix}: <{uri}>\n" for prefix, uri in self.prefixes.items() if prefix not in declared)
+        return header + query_text
+
+    def request(self, query_text):
+        cached = self.cache.get(query_text)
+        if cached is not None:
+            return cached
+        body = urllib.parse.urlencode({"query": query_text})
+        data, content_type = self.pool.post(body, "application/x-www-form-urlencoded",
+                                            "application/sparql-results+json, application/n-triples;q=0.9")
+        if "json" in content_type:
+            result = json.loads(data.decode("utf-8"))
+            size = len(result.get("results", {}).get("bindings", ()))
+        else:
+            result = rdflib.Graph()
+            result.parse(data=data.decode("utf-8"), format=self.rdf_format(content_type))
+            size = len(result)
+        self.cache.put(query_text, result, size)
+        return result
+
+    def rdf_format(self, content_type):
+        if "turtle" in content_type:
+            return "turtle"
+        if "rdf+xml" in content_type:
+            return "xml"
+        return "nt"
+
+    def is_paged(self, query_text):
+        return not re.search(r"\b(LIMIT|OFFSET)\s+\d+\s*$", query_text.strip(), re.IGNORECASE)
+
+    def stream_query(self, query_text):
+        query_text = self.with_prefixes(query_text)
+        query_type = query_form(query_text)
+        if query_type == "ASK":
+            return ["ask"], iter([[self.request(query_text).get("boolean", False)]])
+        if query_type in ("CONSTRUCT", "DESCRIBE"):
+            return ["subject", "predicate", "object"], (list(t) for t in self.request(query_text))
+        query_text = self.ordered(query_text)
+        first = self.request(self.page(query_text, 0))
+        variables = first["head"]["vars"]
+        return variables, self.select_rows(query_text, variables, first)
+
+    def ordered(self, query_text):
+        # LIMIT/OFFSET pages only line up under a fixed order, so order by the projected variables
+        if not self.is_paged(query_text) or re.search(r"\bORDER\s+BY\b", query_text, re.IGNORECASE):
+            return query_text
+        try:
+            variables = prepareQuery(query_text).algebra["PV"]
+        except Exception:
+            return query_text  # Syntax rdflib doesn't parse; paging stays best-effort
+        if not variables:
+            return query_text
+        return f"{query_text}\nORDER BY {' '.join(variable.n3() for variable in variables)}"
+
+    def page(self, query_text, offset):
+        if not self.is_paged(query_text):
+            return query_text
+        return f"{query_text}\nLIMIT {self.page_size} OFFSET {offset}"
+
+    def select_rows(self, query_text, variables, first):
+        result = first
+        offset = 0
+        while True:
+            bindings = result["results"]["bindings"]
+            for binding in bindings:
+                yield [self.to_term(binding.get(v)) for v in variables]
+            if not self.is_paged(query_text) or len(bindings) < self.page_size:
+                return
+            offset += self.page_size
+            result = self.request(self.page(query_text, offset))
+
+    def query(self, query_text, *args, **kwargs):
+        _, rows = self.stream_query(query_text)
+        return (tuple(row) for row in rows)
+
+    def update(self, update_text):
+        if not self.update_pool:
+            raise EndpointError(f"{self.endpoint_url} is read-only (no update endpoint configured)")
+        body = urllib.parse.urlencode({"update": self.with_prefixes(update_text)})
+        self.update_pool.post(body, "application/x-www-form-urlencoded", "*/*")
+        self.cache.clear()
+
+    def add(self, triple):
+        self.update("INSERT DATA { %s }" % " ".join(term.n3() for term in triple))
+
+    def remove(self, triple):
+        self.update("DELETE DATA { %s }" % " ".join(term.n3() for term in triple))
+
+    def present(self, triples, batch_size=200):
+        # Which of the triples the endpoint has, a VALUES batch per request instead of one ASK each
+        triples = [triple for triple in triples if not any(isinstance(term, rdflib.BNode) for term in triple)]
+        found = set()
+        for start in range(0, len(triples), batch_size):
+            rows = " ".join("(%s)" % " ".join(term.n3() for term in triple) for triple in triples[start:start + batch_size])
+            found.update(self.query(f"SELECT ?s ?p ?o WHERE {{ VALUES (?s ?p ?o) {{ {rows} }} ?s ?p ?o }}"))
+        return found
+
+    def apply_changes(self, additions, removals):
+        # The whole diff as one update request. Blank nodes can't be named in
+        # DELETE DATA or matched, so such removals are dropped and such additions
+        # are always inserted.
+        present = self.present(list(additions) + list(removals))
+        removed = [triple for triple in removals if triple in present]
+        added = [triple for triple in additions if triple not in present]
+        operations = []
+        if removed:
+            operations.append("DELETE DATA { %s }" % " .\n".join(" ".join(term.n3() for term in triple) for triple in removed))
+        if added:
+            operations.append("INSERT DATA { %s }" % " .\n".join(" ".join(term.n3() for term in triple) for triple in added))
+        if operations:
+            self.update(" ;\n".join(operations))
+        return added, removed
+
+    def parse(self, *args, **kwargs):
+        raise EndpointError("Files cannot be loaded into a SPARQL endpoint backend")
+
+    def triples(self, pattern):
+        if any(isinstance(term, rdflib.BNode) for term in pattern):
+            # Blank node labels from results don't name anything on the endpoint, and
+            # _:b in a pattern would be a variable, so nothing can be matched
+            return
+        names = ("s", "p", "o")
+        where = " ".join(sparql_term(term) if term is not None else f"?{name}" for term, name in zip(pattern, names))
+        variables = [name for term, name in zip(pattern, names) if term is None]
+        if not variables:
+            if self.request(self.with_prefixes(f"ASK {{ {where} }}")).get("boolean"):
+                yield tuple(pattern)
+            return
+        _, rows = self.stream_query(f"SELECT {' '.join('?' + v for v in variables)} WHERE {{ {where} }}")
+        for row in rows:
+            values = iter(row)
+            yield tuple(term if term is not None else next(values) for term in pattern)
+
+    def subjects(self, predicate=None, object=None):
+        return (s for s, _, _ in self.triples((None, predicate, object)))
+
+    def objects(self, subject=None, predicate=None):
+        return (o for _, _, o in self.triples((subject, predicate, None)))
+
+    def subject_objects(self, predicate=None):
+        return ((s, o) for s, _, o in self.triples((None, predicate, None)))
+
+    def __iter__(self):
+        return self.triples((None, None, None))
+
+    def __contains__(self, triple):
+        return any(True for _ in self.triples(triple))
+
+    def __len__(self):
+        for row in self.query("SELECT (COUNT(*) AS ?n) WHERE { ?s ?p ?o }"):
+            return int(row[0])
+        return 0
+
+    def serialize(self, destination=None, format="xml", **kwargs):
+        graph = rdflib.Graph()
+        for prefix, uri in self.prefixes.items():
+            graph.bind(prefix, uri)
+        for triple in self.triples((None, None, None)):
+            graph.add(triple)
+        return graph.serialize(destination=destination, format=format, **kwargs)
+
+    def to_term(self, value):
+        if value is None:
+            return None
+        if value["type"] == "uri":
+            return rdflib.URIRef(value["value"])
+        if value["type"] == "bnode":
+            return rdflib.BNode(value["value"])
+        if "xml:lang" in value:
+            return rdflib.Literal(value["value"], lang=value["xml:lang"])
+        if "datatype" in value:
+            return rdflib.Literal(value["value"], datatype=value["datatype"])
+        return rdflib.Literal(value["value"])
+
+
+if __name__ == "__main__":
+    # Stand-in endpoint for trying the backend against local files
+    import argparse
+    from sparql_server import SparqlServer
+
+    parser = argparse.ArgumentParser(description="Serve RDF files as a local SPARQL endpoint")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--port", type=int, default=3030)
+    args = parser.parse_args()
+
+    graph = rdflib.Graph()
+    for file_path in args.files:
+        graph.parse(file_path)
+    SparqlServer(lambda: graph, port=args.port, allow_update=True).serve_forever()
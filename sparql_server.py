@@ -0,0 +1,333 @@
+import asyncio
+import csv
+import io
+import json
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+import rdflib
+from sparql_console import stream_query, guarded
+from sparql_endpoint import query_form
+from canonical_export import nt_row, nt_term
+
+RESULT_FORMATS = {
+    "application/sparql-results+json": "json",
+    "application/json": "json",
+    "text/csv": "csv",
+    "text/tab-separated-values": "tsv",
+}
+
+
+class RequestTimeout(Exception):
+    pass
+
+
+def term_json(term):
+    if term is None:
+        return None
+    if isinstance(term, rdflib.URIRef):
+        return {"type": "uri", "value": str(term)}
+    if isinstance(term, rdflib.BNode):
+        return {"type": "bnode", "value": str(term)}
+    value = {"type": "literal", "value": str(term)}
+    if getattr(term, "language", None):
+        value["xml:lang"] = term.language
+    elif getattr(term, "datatype", None):
+        value["datatype"] = str(term.datatype)
+    return value
+
+
+class ResultStream:
+    # Pulls rows from the query in chunks and serializes them on a worker thread
+
+    def __init__(self, graph, query_text, result_format, deadline, chunk_rows=1000):
+        self.graph = graph
+        self.query_text = query_text
+        self.result_format = result_format
+        self.deadline = deadline
+        self.chunk_rows = chunk_rows
+        self.cancelled = False
+        self.columns = None
+        self.rows = None
+        self.started = False
+        self.done = False
+        self.is_ask = False
+        self.is_graph = False
+        self.first_row = True
+
+    def content_type(self):
+        if self.is_graph:
+            return "application/n-triples"
+        return {"json": "application/sparql-results+json", "csv": "text/csv", "tsv": "text/tab-separated-values"}[self.result_format]
+
+    def check(self):
+        # Called from inside query evaluation too, so a timed-out or cancelled query stops running
+        if self.cancelled or time.monotonic() > self.deadline:
+            raise RequestTimeout()
+
+    def open(self):
+        self.columns, self.rows = stream_query(guarded(self.graph, self.check), self.query_text)
+        form = query_form(self.query_text)
+        self.is_ask = form == "ASK"
+        self.is_graph = form in ("CONSTRUCT", "DESCRIBE")
+
+    def next_chunk(self):
+        if self.done or self.cancelled:
+            return b""
+        out = io.StringIO()
+        if not self.started:
+            self.started = True
+            self.write_head(out)
+        count = 0
+        for row in self.rows:
+            self.check()
+            self.write_row(out, row)
+            count += 1
+            if count >= self.chunk_rows or self.cancelled:
+                return out.getvalue().encode("utf-8")
+        self.done = True
+        self.write_tail(out)
+        return out.getvalue().encode("utf-8")
+
+    def write_head(self, out):
+        if self.is_graph:
+            return
+        if self.result_format == "json":
+            if self.is_ask:
+                out.write('{"head": {}, "boolean": ')
+            else:
+                out.write(json.dumps({"head": {"vars": self.columns}})[:-1] + ', "results": {"bindings": [')
+        else:
+            delimiter = "\t" if self.result_format == "tsv" else ","
+            prefix = "?" if self.result_format == "tsv" else ""
+            out.write(delimiter.join(prefix + c for c in self.columns) + "\r\n")
+
+    def write_row(self, out, row):
+        if self.is_graph:
+            # n3() puts multi-line literals in triple quotes, which N-Triples doesn't allow
+            out.write(nt_row(row))
+        elif self.is_ask:
+            out.write("true" if row[0] else "false")
+        elif self.result_format == "json":
+            binding = {c: term_json(v) for c, v in zip(self.columns, row) if v is not None}
+            out.write(("" if self.first_row else ",") + json.dumps(binding))
+            self.first_row = False
+        elif self.result_format == "tsv":
+            # Tabs would split the value into two columns; newlines are already escaped
+            out.write("\t".join("" if v is None else nt_term(v).replace("\t", "\\t") for v in row) + "\n")
+        else:
+            csv.writer(out).writerow(["" if v is None else str(v) for v in row])
+
+    def write_tail(self, out):
+        if self.result_format == "json" and not self.is_graph:
+            out.write("}" if self.is_ask else "]}}")
+
+
+class ReadWriteGate:
+    def __init__(self):
+        self.readers = 0
+        self.writing = False
+        self.condition = asyncio.Condition()
+
+    async def acquire_read(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: not self.writing)
+            self.readers += 1
+
+    async def release_read(self):
+        async with self.condition:
+            self.readers -= 1
+            self.condition.notify_all()
+
+    async def acquire_write(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: not self.writing and self.readers == 0)
+            self.writing = True
+
+    async def release_write(self):
+        async with self.condition:
+            self.writing = False
+            self.condition.notify_all()
+
+
+class SparqlServer:
+    def __init__(self, graph_source, host="127.0.0.1", port=3030, timeout=60, max_workers=8, allow_update=False):
+        self.graph_source = graph_source
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.allow_update = allow_update
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.gate = None
+        self.connections = set()
+
+    def url(self):
+        return f"http://{self.host}:{self.port}/sparql"
+
+    def start(self):
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(ready,), daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    def run(self, ready=None):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.gate = ReadWriteGate()
+        self.server = self.loop.run_until_complete(asyncio.start_server(self.handle_connection, self.host, self.port))
+        if self.port == 0:
+            self.port = self.server.sockets[0].getsockname()[1]
+        print(f"Serving SPARQL endpoint at {self.url()}")
+        if ready:
+            ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.server.close()
+            self.loop.run_until_complete(self.server.wait_closed())
+            self.loop.close()
+
+    def serve_forever(self):
+        self.run()
+
+    def stop(self):
+        if self.loop and self.loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.shutdown(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            if self.thread:
+                self.thread.join()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        print("SPARQL endpoint stopped")
+
+    async def shutdown(self):
+        self.server.close()
+        # Cancelled requests stop their queries before the tasks finish
+        tasks = list(self.connections)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.server.wait_closed()
+
+    async def handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = b""
+                if "content-length" in headers:
+                    body = await reader.readexactly(int(headers["content-length"]))
+                keep_alive = headers.get("connection", "").lower() != "close" and version.strip() == "HTTP/1.1"
+                await self.handle_request(method, target, headers, body, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            pass  # Server shutting down
+        finally:
+            self.connections.discard(task)
+            writer.close()
+
+    def parse_params(self, method, target, headers, body):
+        split = urllib.parse.urlsplit(target)
+        params = {k: v[0] for k, v in urllib.parse.parse_qs(split.query).items()}
+        content_type = headers.get("content-type", "")
+        if method == "POST":
+            if content_type.startswith("application/sparql-query"):
+                params["query"] = body.decode("utf-8")
+            elif content_type.startswith("application/sparql-update"):
+                params["update"] = body.decode("utf-8")
+            else:
+                params.update({k: v[0] for k, v in urllib.parse.parse_qs(body.decode("utf-8")).items()})
+        return split.path, params
+
+    def negotiate(self, headers):
+        for accepted in headers.get("accept", "").split(","):
+            media_type = accepted.split(";")[0].strip()
+            if media_type in RESULT_FORMATS:
+                return RESULT_FORMATS[media_type]
+        return "json"
+
+    async def handle_request(self, method, target, headers, body, writer):
+        path, params = self.parse_params(method, target, headers, body)
+        if path not in ("/sparql", "/"):
+            return self.send_simple(writer, 404, "Not Found", "Unknown path")
+        if "update" in params:
+            return await self.handle_update(params["update"], writer)
+        if "query" not in params:
+            return self.send_simple(writer, 400, "Bad Request", "Missing query parameter")
+        deadline = time.monotonic() + self.timeout
+        stream = ResultStream(self.graph_source(), params["query"], self.negotiate(headers), deadline)
+        await self.gate.acquire_read()
+        try:
+            try:
+                await self.run_with_deadline(stream, stream.open)
+                chunk = await self.run_with_deadline(stream, stream.next_chunk)
+            except RequestTimeout:
+                return self.send_simple(writer, 503, "Service Unavailable", f"Query timed out after {self.timeout} s")
+            except Exception as e:
+                return self.send_simple(writer, 400, "Bad Request", f"Error executing query: {e}")
+            writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: {stream.content_type()}; charset=utf-8\r\nTransfer-Encoding: chunked\r\n\r\n".encode("latin-1"))
+            while chunk:
+                self.write_chunk(writer, chunk)
+                await writer.drain()
+                try:
+                    chunk = await self.run_with_deadline(stream, stream.next_chunk)
+                except Exception:
+                    # Headers are already sent; truncating is the only way to signal the failure
+                    writer.close()
+                    return
+            self.write_chunk(writer, b"")
+        finally:
+            await self.gate.release_read()
+
+    async def handle_update(self, update_text, writer):
+        if not self.allow_update:
+            return self.send_simple(writer, 403, "Forbidden", "This endpoint is read-only")
+        await self.gate.acquire_write()
+        try:
+            await self.loop.run_in_executor(self.executor, self.graph_source().update, update_text)
+            self.send_simple(writer, 200, "OK", "")
+        except Exception as e:
+            self.send_simple(writer, 400, "Bad Request", f"Error executing update: {e}")
+        finally:
+            await self.gate.release_write()
+
+    async def run_with_deadline(self, stream, function):
+        # The stream checks its own deadline while evaluating; the wait here is
+        # a backstop. Either way the request (and its read gate) is only
+        # released once the worker thread has actually stopped.
+        future = self.loop.run_in_executor(self.executor, function)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), max(0, stream.deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            stream.cancelled = True
+            await asyncio.gather(future, return_exceptions=True)
+            raise RequestTimeout()
+        except asyncio.CancelledError:
+            stream.cancelled = True
+            await asyncio.gather(future, return_exceptions=True)
+            raise
+
+    def write_chunk(self, writer, data):
+        writer.write(f"{len(data):X}\r\n".encode("latin-1") + data + b"\r\n")
+
+    def send_simple(self, writer, status, reason, message):
+        data = message.encode("utf-8")
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: text/plain; charset=utf-8\r\nContent-Length: {len(data)}\r\n\r\n".encode("latin-1") + data)
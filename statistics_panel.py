@@ -0,0 +1,145 @@
+import html
+import os
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTextBrowser, QFileDialog
+from PyQt5.QtCore import QThread, QTimer, pyqtSignal
+from statistics_profiler import StatisticsProfiler
+
+
+class ProfileWorker(QThread):
+    profile_ready = pyqtSignal(object)
+    profile_failed = pyqtSignal(str)
+
+    def __init__(self, paths=None, graph=None):
+        super().__init__()
+        self.paths = paths
+        self.graph = graph
+
+    def run(self):
+        profiler = StatisticsProfiler()
+        try:
+            if self.paths:
+                for path in self.paths:
+                    profiler.profile_file(path)
+            else:
+                profiler.profile_triples(iter(self.graph))
+        except Exception as e:
+            self.profile_failed.emit(str(e))
+            return
+        self.profile_ready.emit(profiler)
+
+
+class StatisticsPanel(QWidget):
+    def __init__(self, ontology_viewer):
+        super().__init__()
+        self.ontology_viewer = ontology_viewer
+        self.profiler = None
+        self.live = False
+        self.worker = None
+        self.worker_live = False
+        self.pending = None
+
+        self.layout = QVBoxLayout()
+        self.setLayout(self.layout)
+
+        self.profile_file_button = QPushButton("Profile File...")
+        self.profile_file_button.setToolTip("Stream a file through the profiler without loading it")
+        self.profile_file_button.clicked.connect(self.choose_files)
+        self.profile_graph_button = QPushButton("Profile Loaded Graph")
+        self.profile_graph_button.setToolTip("Profile the loaded graph and keep the figures up to date while editing")
+        self.profile_graph_button.clicked.connect(self.profile_graph)
+        self.source_label = QLabel("Not profiled yet")
+
+        controls = QHBoxLayout()
+        controls.addWidget(self.profile_file_button)
+        controls.addWidget(self.profile_graph_button)
+
+        self.report_view = QTextBrowser()
+
+        self.layout.addLayout(controls)
+        self.layout.addWidget(self.source_label)
+        self.layout.addWidget(self.report_view)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(500)
+        self.refresh_timer.timeout.connect(self.show_report)
+        # Sketches can't forget removed triples, so removals trigger a (debounced) full pass
+        self.rebuild_timer = QTimer(self)
+        self.rebuild_timer.setSingleShot(True)
+        self.rebuild_timer.setInterval(2000)
+        self.rebuild_timer.timeout.connect(self.profile_graph)
+
+    def reset(self):
+        self.live = False
+        self.profiler = None
+        self.source_label.setText("Not profiled yet")
+        self.report_view.clear()
+
+    def choose_files(self):
+        paths, _ = QFileDialog.getOpenFileNames(self, "Profile File", "", "RDF files (*.owl *.rdf *.xml *.ttl *.nt *.n3 *.gz *.bz2 *.xz);;All files (*)")
+        if paths:
+            self.start(lambda: ProfileWorker(paths=paths), False, ", ".join(os.path.basename(path) for path in paths))
+
+    def profile_graph(self):
+        self.start(lambda: ProfileWorker(graph=self.ontology_viewer.snapshot()), True, "Loaded graph (live)")
+
+    def start(self, make_worker, live, source):
+        if self.worker:
+            # Run it once the current pass is done; the latest request wins
+            self.pending = (make_worker, live, source)
+            return
+        if not live:
+            self.live = False
+        self.worker_live = live
+        self.worker = make_worker()
+        self.worker.profile_ready.connect(lambda profiler: self.on_profile_ready(profiler, live, source))
+        self.worker.profile_failed.connect(self.on_profile_failed)
+        self.source_label.setText(f"Profiling {source}...")
+        self.worker.start()
+
+    def on_profile_ready(self, profiler, live, source):
+        self.worker.wait()
+        self.worker = None
+        self.profiler = profiler
+        self.live = live
+        self.source_label.setText(source)
+        self.show_report()
+        self.start_pending()
+
+    def on_profile_failed(self, error):
+        self.worker.wait()
+        self.worker = None
+        self.source_label.setText(f"Profiling failed: {error}")
+        self.start_pending()
+
+    def start_pending(self):
+        if self.pending:
+            pending, self.pending = self.pending, None
+            self.start(*pending)
+
+    def on_graph_changed(self, diff):
+        if self.worker and self.worker_live:
+            # The running pass profiles a snapshot from before this change, so profile again afterwards
+            if self.pending is None:
+                self.profile_graph()
+            return
+        if not self.live:
+            return
+        if diff.removed:
+            self.rebuild_timer.start()
+            return
+        self.profiler.profile_triples(diff.added)
+        self.refresh_timer.start()
+
+    def show_report(self):
+        if self.profiler is None:
+            return
+        name = self.ontology_viewer.extract_last_part
+        report_html = ""
+        for section, rows in self.profiler.report().items():
+            report_html += f"<h3>{section}</h3>\n<table>"
+            for key, value in rows.items():
+                label = name(key) if key.startswith("http") else key
+                report_html += f"<tr><td title='{html.escape(key)}'>{html.escape(label)}</td><td align='right'>{value}</td></tr>\n"
+            report_html += "</table>"
+        self.report_view.setHtml(report_html)
@@ -0,0 +1,214 @@
+import hashlib
+import heapq
+import time
+from collections import Counter
+import numpy as np
+import rdflib
+from rdflib.store import Store
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+from rdflib.util import guess_format
+from parallel_import import split_compression
+
+
+def hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def term_key(term):
+    # Cheaper than n3() and still distinguishes IRIs, blank nodes and literals
+    if isinstance(term, rdflib.Literal):
+        return f'"{term}"{term.language or term.datatype or ""}'
+    if isinstance(term, rdflib.BNode):
+        return "_:" + term
+    return str(term)
+
+
+class HyperLogLog:
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_many(self, texts):
+        values = np.fromiter((hash64(text) for text in texts), dtype=np.uint64)
+        bits = 64 - self.precision
+        index = (values >> np.uint64(bits)).astype(np.int64)
+        rest = (values & np.uint64((1 << bits) - 1)).astype(np.float64)  # exact, bits <= 53
+        # frexp's exponent is the bit length of rest (0 for rest == 0)
+        rank = (bits - np.frexp(rest)[1] + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def count(self):
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)  # Linear counting for small cardinalities
+        return int(round(estimate))
+
+
+class CountMinSketch:
+    # Approximate frequencies in bounded memory, plus the top_k most frequent keys seen
+    def __init__(self, width=4096, depth=4, top_k=50):
+        self.width = width
+        self.depth = depth
+        self.top_k = top_k
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.candidates = {}
+
+    def cells(self, key):
+        value = hash64(key)
+        low, high = value & 0xFFFFFFFF, value >> 32
+        return [(low + i * high) % self.width for i in range(self.depth)]
+
+    def add_counts(self, counts):
+        for key, count in counts.items():
+            cells = self.cells(key)
+            for row, cell in enumerate(cells):
+                self.table[row, cell] += count
+            self.candidates[key] = min(self.table[row, cell] for row, cell in enumerate(cells))
+        if len(self.candidates) > 20 * self.top_k:
+            self.candidates = dict(heapq.nlargest(self.top_k * 10, self.candidates.items(), key=lambda item: item[1]))
+
+    def estimate(self, key):
+        return int(min(self.table[row, cell] for row, cell in enumerate(self.cells(key))))
+
+    def most_common(self):
+        ranked = [(key, self.estimate(key)) for key in self.candidates]
+        return heapq.nlargest(self.top_k, ranked, key=lambda item: item[1])
+
+
+class ProfilerStore(Store):
+    # Lets rdflib's parsers stream triples into the profiler instead of into a graph
+    def __init__(self, profiler):
+        super().__init__()
+        self.profiler = profiler
+
+    def add(self, triple, context, quoted=False):
+        self.profiler.triple(*triple)
+
+
+class StatisticsProfiler:
+    # One pass over a stream of triples. Distinct counts use HyperLogLog and
+    # frequencies use count-min sketches; only the subClassOf edges are kept
+    # exactly, for hierarchy depth and fan-out.
+
+    def __init__(self, top_k=50, batch_size=20000):
+        self.top_k = top_k
+        self.batch_size = batch_size
+        self.triples = 0
+        self.subjects = HyperLogLog()
+        self.typed_subjects = HyperLogLog()
+        self.objects = HyperLogLog()
+        self.predicates = HyperLogLog()
+        self.classes = HyperLogLog()
+        self.property_usage = CountMinSketch(top_k=top_k)
+        self.class_usage = CountMinSketch(top_k=top_k)
+        self.languages = Counter()
+        self.literals = 0
+        self.subclass_edges = set()
+        self.elapsed = 0.0
+        self.batch = {"subjects": [], "typed_subjects": [], "objects": [], "properties": Counter(), "classes": Counter()}
+
+    def triple(self, s, p, o):
+        # Sketch updates are buffered and applied in vectorized batches
+        self.triples += 1
+        batch = self.batch
+        subject = term_key(s)
+        batch["subjects"].append(subject)
+        batch["objects"].append(term_key(o))
+        batch["properties"][str(p)] += 1
+        if p == rdflib.RDF.type:
+            batch["typed_subjects"].append(subject)
+            batch["classes"][term_key(o)] += 1
+        elif p == rdflib.RDFS.subClassOf and isinstance(s, rdflib.URIRef) and isinstance(o, rdflib.URIRef):
+            self.subclass_edges.add((str(s), str(o)))
+        if isinstance(o, rdflib.Literal):
+            self.literals += 1
+            if o.language:
+                self.languages[o.language.lower()] += 1
+            elif o.datatype is None:
+                self.languages["(untagged)"] += 1
+        if len(batch["subjects"]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        batch = self.batch
+        self.subjects.add_many(batch["subjects"])
+        self.objects.add_many(batch["objects"])
+        self.typed_subjects.add_many(batch["typed_subjects"])
+        self.predicates.add_many(batch["properties"])
+        self.classes.add_many(batch["classes"])
+        self.property_usage.add_counts(batch["properties"])
+        self.class_usage.add_counts(batch["classes"])
+        self.batch = {"subjects": [], "typed_subjects": [], "objects": [], "properties": Counter(), "classes": Counter()}
+
+    def profile_triples(self, triples):
+        started = time.perf_counter()
+        for s, p, o in triples:
+            self.triple(s, p, o)
+        self.elapsed += time.perf_counter() - started
+        return self
+
+    def profile_file(self, path):
+        started = time.perf_counter()
+        name, opener = split_compression(path)
+        with opener(path, "rb") as source:
+            if name.lower().endswith(".nt"):
+                W3CNTriplesParser(self).parse(source)
+            else:
+                rdflib.Graph(store=ProfilerStore(self)).parse(source=source, format=guess_format(name) or "xml")
+        self.elapsed += time.perf_counter() - started
+        return self
+
+    def hierarchy(self):
+        children = {}
+        parents = {}
+        for child, parent in self.subclass_edges:
+            children.setdefault(parent, []).append(child)
+            parents.setdefault(child, []).append(parent)
+        depth = {}
+        roots = [node for node in children if node not in parents]
+        frontier = [(root, 0) for root in roots]
+        while frontier:
+            node, level = frontier.pop()
+            if depth.get(node, -1) >= level or level > len(self.subclass_edges):
+                continue
+            depth[node] = level
+            frontier.extend((child, level + 1) for child in children.get(node, ()))
+        fan_out = [len(c) for c in children.values()]
+        return {
+            "classes in hierarchy": len(set(children) | set(parents)),
+            "root classes": len(roots),
+            "max depth": max(depth.values(), default=0),
+            "max fan-out": max(fan_out, default=0),
+            "mean fan-out": round(sum(fan_out) / len(fan_out), 2) if fan_out else 0,
+        }
+
+    def report(self):
+        self.flush()
+        subjects = self.subjects.count()
+        return {
+            "Overview": {
+                "triples": self.triples,
+                "distinct subjects (approx.)": subjects,
+                "distinct objects (approx.)": self.objects.count(),
+                "distinct predicates (approx.)": self.predicates.count(),
+                "classes used (approx.)": self.classes.count(),
+                "untyped subjects (approx.)": max(0, subjects - self.typed_subjects.count()),
+                "literals": self.literals,
+                "profiling time (s)": round(self.elapsed, 2),
+            },
+            "Hierarchy": self.hierarchy(),
+            "Property usage": dict(self.property_usage.most_common()),
+            "Class usage": dict(self.class_usage.most_common()),
+            "Language tags": dict(self.languages.most_common(self.top_k)),
+        }
+
+
+def format_report(report):
+    lines = []
+    for section, rows in report.items():
+        lines.append(section)
+        for key, value in rows.items():
+            lines.append(f"  {key}: {value}")
+    return "\n".join(lines)
@@ -0,0 +1,176 @@
+import re
+from collections import Counter
+import numpy as np
+import rdflib
+
+# Matched by local name, so any CIDOC CRM namespace (or the Erlangen OWL version) works
+HAS_TIME_SPAN = "P4_has_time-span"
+BEGIN_NAMES = ("P82a_begin_of_the_begin", "P81a_end_of_the_begin")
+END_NAMES = ("P82b_end_of_the_end", "P81b_begin_of_the_end")
+# Production, creation and existence links between an event and what it brought about, both directions
+EVENT_LINKS = {"P108", "P108i", "P92", "P92i", "P94", "P94i"}
+OPEN_BEGIN = np.iinfo(np.int64).min // 2
+OPEN_END = np.iinfo(np.int64).max // 2
+
+DATE_PATTERN = re.compile(r"^\s*(-?\d{1,})(?:-(\d\d)(?:-(\d\d))?)?")
+
+
+def days_from_civil(year, month, day):
+    # Proleptic Gregorian day number relative to 1970-01-01, valid for negative years too
+    year -= month <= 2
+    era = (year if year >= 0 else year - 399) // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def days_in_month(year, month):
+    if month == 12:
+        return 31
+    return days_from_civil(year, month + 1, 1) - days_from_civil(year, month, 1)
+
+
+def parse_date(text, end=False):
+    # xsd:dateTime, xsd:date, xsd:gYearMonth and xsd:gYear (or a bare year) as a day number.
+    # Missing parts widen to the start of the period, or to its end when end=True.
+    match = DATE_PATTERN.match(str(text))
+    if not match:
+        return None
+    year = int(match.group(1))
+    month = int(match.group(2)) if match.group(2) else (12 if end else 1)
+    day = int(match.group(3)) if match.group(3) else (days_in_month(year, month) if end else 1)
+    if not 1 <= month <= 12 or not 1 <= day <= days_in_month(year, month):
+        return None
+    return days_from_civil(year, month, day)
+
+
+def local_name(uri):
+    return str(uri).split('/')[-1].split('#')[-1]
+
+
+class TemporalIndex:
+    # Intervals of E52 Time-Spans (P82a/P82b, falling back to P81a/P81b) as
+    # parallel arrays sorted by begin day. Triple-level changes update the
+    # dictionaries right away; the arrays are re-sorted on the next query.
+
+    def __init__(self):
+        self.bounds = {}  # time-span -> {local name: Counter of days asserted for it}
+        self.time_spans = {}  # entity -> set of time-spans
+        self.entities = {}  # time-span -> set of entities
+        self.roles = {}  # predicate -> local name if it is temporal, else None
+        self.dirty = True
+        self.span_list = []
+        self.begins = np.zeros(0, dtype=np.int64)
+        self.ends = np.zeros(0, dtype=np.int64)
+        self.max_length = 0
+
+    def is_event_link(self, predicate):
+        return local_name(predicate).split("_")[0] in EVENT_LINKS
+
+    def role(self, predicate):
+        role = self.roles.get(predicate, False)
+        if role is False:
+            name = local_name(predicate)
+            role = name if name == HAS_TIME_SPAN or name in BEGIN_NAMES or name in END_NAMES else None
+            self.roles[predicate] = role
+        return role
+
+    def add(self, triple):
+        subject, predicate, object_ = triple
+        role = self.role(predicate)
+        if role is None:
+            return
+        if role == HAS_TIME_SPAN:
+            self.time_spans.setdefault(subject, set()).add(object_)
+            self.entities.setdefault(object_, set()).add(subject)
+        else:
+            day = parse_date(object_, end=role in END_NAMES)
+            if day is None:
+                return
+            self.bounds.setdefault(subject, {}).setdefault(role, Counter())[day] += 1
+        self.dirty = True
+
+    def remove(self, triple):
+        subject, predicate, object_ = triple
+        role = self.role(predicate)
+        if role is None:
+            return
+        if role == HAS_TIME_SPAN:
+            self.time_spans.get(subject, set()).discard(object_)
+            self.entities.get(object_, set()).discard(subject)
+        else:
+            days = self.bounds.get(subject, {}).get(role)
+            day = parse_date(object_, end=role in END_NAMES)
+            if days is None or days[day] == 0:
+                return
+            days[day] -= 1
+            if days[day] == 0:
+                del days[day]
+            if not days:
+                del self.bounds[subject][role]
+                if not self.bounds[subject]:
+                    del self.bounds[subject]
+        self.dirty = True
+
+    def interval(self, span):
+        # A time-span with only one known end is treated as a single point in time.
+        # With several values for a bound the widest interval wins.
+        bounds = self.bounds.get(span, {})
+        begin = next((min(bounds[name]) for name in BEGIN_NAMES if name in bounds), None)
+        end = next((max(bounds[name]) for name in END_NAMES if name in bounds), None)
+        begin = end if begin is None else begin
+        end = begin if end is None else end
+        return (begin, end) if begin is not None and begin <= end else None
+
+    def flush(self):
+        if not self.dirty:
+            return
+        intervals = [(span, self.interval(span)) for span in self.bounds]
+        intervals = sorted((interval, span) for span, interval in intervals if interval is not None)
+        self.span_list = [span for _, span in intervals]
+        array = np.array([interval for interval, _ in intervals], dtype=np.int64).reshape(-1, 2)
+        self.begins = array[:, 0].copy()
+        self.ends = array[:, 1].copy()
+        self.max_length = int((self.ends - self.begins).max()) if len(self.begins) else 0
+        self.dirty = False
+
+    def overlapping(self, start=OPEN_BEGIN, end=OPEN_END):
+        # Time-spans sharing at least one day with [start, end]. Since no span is
+        # longer than max_length, only begins in [start - max_length, end] qualify.
+        self.flush()
+        low = np.searchsorted(self.begins, max(start - self.max_length, OPEN_BEGIN), side="left")
+        high = np.searchsorted(self.begins, end, side="right")
+        hits = low + np.flatnonzero(self.ends[low:high] >= start)
+        return [self.span_list[i] for i in hits]
+
+    def within(self, start=OPEN_BEGIN, end=OPEN_END):
+        # Time-spans lying entirely inside [start, end]
+        self.flush()
+        low = np.searchsorted(self.begins, start, side="left")
+        high = np.searchsorted(self.begins, end, side="right")
+        hits = low + np.flatnonzero(self.ends[low:high] <= end)
+        return [self.span_list[i] for i in hits]
+
+    def dated_entities(self, start=OPEN_BEGIN, end=OPEN_END, contained=False):
+        spans = self.within(start, end) if contained else self.overlapping(start, end)
+        return {entity for span in spans for entity in self.entities.get(span, ())}
+
+    def linked_instances(self, graph, event):
+        # What an event produced, created or brought into existence, e.g. an
+        # object whose production is dated. Only reads the graph, so it is safe
+        # to call from a worker holding a snapshot.
+        for predicate, object_ in graph.predicate_objects(event):
+            if isinstance(object_, rdflib.URIRef) and self.is_event_link(predicate):
+                yield object_
+        for subject, predicate in graph.subject_predicates(event):
+            if isinstance(subject, rdflib.URIRef) and self.is_event_link(predicate):
+                yield subject
+
+    def matching_instances(self, graph, start=OPEN_BEGIN, end=OPEN_END, contained=False):
+        # Dated entities (mostly events) plus the instances linked to them
+        events = self.dated_entities(start, end, contained)
+        instances = set(events)
+        for event in events:
+            instances.update(self.linked_instances(graph, event))
+        return instances
@@ -52,7 +52,7 @@ class TripleWizard(QWidget):
             subject_uri = rdflib.URIRef(subject)
             predicate_uri = rdflib.URIRef(predicate)
             object_uri = rdflib.URIRef(object_)
-            self.ontology_viewer.graph.add((subject_uri, predicate_uri, object_uri))
+            self.ontology_viewer.add_triples([(subject_uri, predicate_uri, object_uri)])
             print(f"Added triple: ({subject}, {predicate}, {object_})")
             self.subject_input.clear()
             self.object_input.clear()
\ No newline at end of file
@@ -0,0 +1,126 @@
+import numpy as np
+import rdflib
+
+
+class TermDictionary:
+    def __init__(self):
+        self.ids = {}
+        self.terms = []
+
+    def __len__(self):
+        return len(self.terms)
+
+    def encode(self, term):
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = len(self.terms)
+            self.ids[term] = term_id
+            self.terms.append(term)
+        return term_id
+
+    def lookup(self, term):
+        return self.ids.get(term)
+
+    def decode(self, term_id):
+        return self.terms[term_id]
+
+    def encode_many(self, terms):
+        return np.fromiter((self.encode(term) for term in terms), dtype=np.int64)
+
+    def lookup_many(self, terms):
+        ids = (self.ids.get(term) for term in terms)
+        return np.array([term_id for term_id in ids if term_id is not None], dtype=np.int64)
+
+
+class TypeIndex:
+    # rdf:type assertions as two parallel integer arrays (subject id, class id)
+
+    def __init__(self, terms=None):
+        self.terms = terms if terms is not None else TermDictionary()
+        self.subjects = np.zeros(0, dtype=np.int64)
+        self.classes = np.zeros(0, dtype=np.int64)
+        self.pending = []
+
+    def add(self, subject, class_):
+        self.pending.append((self.terms.encode(subject), self.terms.encode(class_)))
+
+    def remove(self, subject, class_):
+        self.remove_many([(subject, class_)])
+
+    def remove_many(self, pairs):
+        # One mask over the arrays for the whole batch, however many pairs go
+        self.flush()
+        ids = [(self.terms.lookup(subject), self.terms.lookup(class_)) for subject, class_ in pairs]
+        ids = np.array([pair for pair in ids if None not in pair], dtype=np.int64).reshape(-1, 2)
+        if not len(ids):
+            return
+        width = len(self.terms)
+        keep = ~np.isin(self.subjects * width + self.classes, ids[:, 0] * width + ids[:, 1])
+        self.subjects = self.subjects[keep]
+        self.classes = self.classes[keep]
+
+    def flush(self):
+        if self.pending:
+            array = np.array(self.pending, dtype=np.int64)
+            self.subjects = np.concatenate([self.subjects, array[:, 0]])
+            self.classes = np.concatenate([self.classes, array[:, 1]])
+            self.pending = []
+
+    def __len__(self):
+        self.flush()
+        return len(self.subjects)
+
+    def class_ids(self, class_uris):
+        return self.terms.lookup_many(rdflib.URIRef(uri) for uri in class_uris)
+
+    def instance_ids(self, class_uri, closure=None):
+        self.flush()
+        class_uris = closure.descendants(class_uri, include_self=True) if closure is not None else [class_uri]
+        mask = np.isin(self.classes, self.class_ids(class_uris))
+        return np.unique(self.subjects[mask])
+
+    def instances_of(self, class_uri, closure=None):
+        # With a closure, instances of subclasses are included
+        return [self.terms.decode(i) for i in self.instance_ids(class_uri, closure)]
+
+    def types_of(self, subject):
+        self.flush()
+        subject_id = self.terms.lookup(subject)
+        if subject_id is None:
+            return []
+        return [self.terms.decode(i) for i in np.unique(self.classes[self.subjects == subject_id])]
+
+    def grouped_by_class(self):
+        self.flush()
+        order = np.argsort(self.classes, kind="stable")
+        classes = self.classes[order]
+        subjects = self.subjects[order]
+        boundaries = np.flatnonzero(np.diff(classes)) + 1
+        groups = {}
+        for class_group, subject_group in zip(np.split(classes, boundaries), np.split(subjects, boundaries)):
+            if len(class_group):
+                groups[self.terms.decode(class_group[0])] = subject_group
+        return groups
+
+    def class_counts(self, closure, chunk_size=65536):
+        # Distinct instances per class, directly typed and including subclasses.
+        # The inclusive count ORs the closure rows of each subject's classes, so an
+        # instance typed with two subclasses of the same class is counted once.
+        self.flush()
+        pairs = np.unique(np.stack([self.subjects, self.classes], axis=1), axis=0)
+        class_ids, direct = np.unique(pairs[:, 1], return_counts=True)
+        direct_counts = {str(self.terms.decode(c)): int(n) for c, n in zip(class_ids, direct)}
+        rows = np.array([closure.ids.get(str(self.terms.decode(c)), -1) for c in class_ids], dtype=np.int64)
+        row_index = rows[np.searchsorted(class_ids, pairs[:, 1])] if len(pairs) else rows
+        known = row_index >= 0
+        subjects = pairs[known, 0]
+        row_index = row_index[known]
+        totals = np.zeros(closure.size, dtype=np.int64)
+        starts = np.flatnonzero(np.r_[True, subjects[1:] != subjects[:-1]]) if len(subjects) else subjects
+        for i in range(0, len(starts), chunk_size):
+            low = starts[i]
+            high = starts[i + chunk_size] if i + chunk_size < len(starts) else len(subjects)
+            masks = np.bitwise_or.reduceat(closure.matrix[row_index[low:high]], starts[i:i + chunk_size] - low, axis=0)
+            totals += np.unpackbits(masks, axis=1, count=closure.size, bitorder="little").sum(axis=0, dtype=np.int64)
+        total_counts = {closure.nodes[j]: int(totals[j]) for j in np.flatnonzero(totals)}
+        return direct_counts, total_counts
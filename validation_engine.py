@@ -0,0 +1,165 @@
+from collections import namedtuple
+import numpy as np
+import rdflib
+
+SH = rdflib.Namespace("http://www.w3.org/ns/shacl#")
+LITERAL_RANGES = {str(rdflib.RDFS.Literal), str(rdflib.RDFS.Datatype), str(rdflib.RDF.PlainLiteral), str(rdflib.RDF.langString)}
+
+Violation = namedtuple("Violation", ["focus", "path", "value", "message"])
+PropertyShape = namedtuple("PropertyShape", ["target_class", "path", "min_count", "max_count", "class_", "datatype"])
+
+
+class ValidationEngine:
+    # Checks are done per property over integer-encoded subject/object arrays,
+    # using the type index and class closure for membership tests.
+
+    def __init__(self, schema_graph, class_closure, type_index):
+        self.schema_graph = schema_graph
+        self.class_closure = class_closure
+        self.type_index = type_index
+        self.terms = type_index.terms
+        self.shapes = []
+        self.violations = None
+        self.member_masks = {}
+
+    def load_shapes(self, graph):
+        self.shapes = []
+        for shape in graph.subjects(rdflib.RDF.type, SH.NodeShape):
+            targets = [str(c) for c in graph.objects(shape, SH.targetClass)]
+            for property_shape in graph.objects(shape, SH.property):
+                path = graph.value(property_shape, SH.path)
+                if not isinstance(path, rdflib.URIRef):
+                    continue  # Only predicate paths are supported
+                min_count = graph.value(property_shape, SH.minCount)
+                max_count = graph.value(property_shape, SH.maxCount)
+                class_ = graph.value(property_shape, SH["class"])
+                datatype = graph.value(property_shape, SH.datatype)
+                for target in targets:
+                    self.shapes.append(PropertyShape(target, path,
+                                                     int(min_count) if min_count is not None else None,
+                                                     int(max_count) if max_count is not None else None,
+                                                     str(class_) if class_ is not None else None,
+                                                     datatype))
+        print(f"Loaded {len(self.shapes)} SHACL property shapes")
+
+    def member_mask(self, class_uri):
+        # Boolean array over term ids: True for nodes typed with class_uri or a subclass
+        mask = self.member_masks.get(class_uri)
+        if mask is None or len(mask) < len(self.terms):
+            class_ids = self.type_index.class_ids(self.class_closure.descendants(class_uri, include_self=True))
+            mask = np.zeros(len(self.terms), dtype=bool)
+            mask[self.type_index.subjects[np.isin(self.type_index.classes, class_ids)]] = True
+            self.member_masks[class_uri] = mask
+        return mask
+
+    def typed_mask(self):
+        mask = np.zeros(len(self.terms), dtype=bool)
+        mask[self.type_index.subjects] = True
+        return mask
+
+    def validate_all(self, graph):
+        self.type_index.flush()
+        self.member_masks = {}
+        violations = []
+        for property_uri in sorted(set(self.schema_graph.domains) | set(self.schema_graph.ranges)):
+            pairs = list(graph.subject_objects(rdflib.URIRef(property_uri)))
+            violations += self.check_property(property_uri, pairs)
+        violations += self.check_shapes(graph)
+        self.violations = {}
+        for violation in violations:
+            self.violations.setdefault(violation.focus, []).append(violation)
+        print(f"Validation: {len(violations)} violations on {len(self.violations)} nodes")
+        return violations
+
+    def validate_nodes(self, graph, nodes):
+        # Re-check every triple whose subject is one of the nodes or points at one of them
+        self.type_index.flush()
+        self.member_masks = {}
+        focus_nodes = set(nodes)
+        for node in nodes:
+            focus_nodes.update(graph.subjects(None, node))
+        pairs_by_property = {}
+        for focus in focus_nodes:
+            for _, predicate, object_ in graph.triples((focus, None, None)):
+                pairs_by_property.setdefault(str(predicate), []).append((focus, object_))
+        violations = []
+        for property_uri, pairs in pairs_by_property.items():
+            if property_uri in self.schema_graph.domains or property_uri in self.schema_graph.ranges:
+                violations += self.check_property(property_uri, pairs)
+        violations += self.check_shapes(graph, focus_nodes)
+        if self.violations is None:
+            self.violations = {}
+        for focus in focus_nodes:
+            self.violations.pop(focus, None)
+        for violation in violations:
+            self.violations.setdefault(violation.focus, []).append(violation)
+        return violations
+
+    def check_property(self, property_uri, pairs):
+        if not pairs:
+            return []
+        subjects = [s for s, _ in pairs]
+        objects = [o for _, o in pairs]
+        subject_ids = self.terms.encode_many(subjects)
+        object_ids = self.terms.encode_many(objects)
+        is_literal = np.fromiter((isinstance(o, rdflib.Literal) for o in objects), dtype=bool, count=len(objects))
+        typed = self.typed_mask()
+        violations = []
+        name = property_uri.split('/')[-1].split('#')[-1]
+
+        for domain in self.schema_graph.domains.get(property_uri, ()):
+            bad = typed[subject_ids] & ~self.member_mask(domain)[subject_ids]
+            for i in np.flatnonzero(bad):
+                violations.append(Violation(subjects[i], property_uri, objects[i], f"Subject of {name} is not a {domain.split('/')[-1].split('#')[-1]}"))
+
+        for range_ in self.schema_graph.ranges.get(property_uri, ()):
+            range_name = range_.split('/')[-1].split('#')[-1]
+            if range_ in LITERAL_RANGES or range_.startswith(str(rdflib.XSD)):
+                bad = ~is_literal
+                message = f"Value of {name} should be a literal ({range_name})"
+            else:
+                bad = is_literal | (typed[object_ids] & ~self.member_mask(range_)[object_ids])
+                message = f"Value of {name} is not a {range_name}"
+            for i in np.flatnonzero(bad):
+                violations.append(Violation(subjects[i], property_uri, objects[i], message))
+        return violations
+
+    def check_shapes(self, graph, focus_nodes=None):
+        # With focus_nodes, only those nodes are checked and only their own triples are read
+        restrict_ids = self.terms.lookup_many(focus_nodes) if focus_nodes is not None else None
+        violations = []
+        for shape in self.shapes:
+            focus_ids = self.type_index.instance_ids(shape.target_class, self.class_closure)
+            if restrict_ids is not None:
+                focus_ids = focus_ids[np.isin(focus_ids, restrict_ids)]
+            if not len(focus_ids):
+                continue
+            if focus_nodes is None:
+                pairs = list(graph.subject_objects(shape.path))
+            else:
+                pairs = [(focus, value) for focus in focus_nodes for value in graph.objects(focus, shape.path)]
+            subject_ids = self.terms.encode_many(s for s, _ in pairs)
+            name = shape.path.split('/')[-1].split('#')[-1]
+            if shape.min_count is not None or shape.max_count is not None:
+                counts = np.bincount(subject_ids, minlength=len(self.terms))[focus_ids]
+                if shape.min_count is not None:
+                    for i in np.flatnonzero(counts < shape.min_count):
+                        violations.append(Violation(self.terms.decode(focus_ids[i]), str(shape.path), None,
+                                                    f"{name} has {counts[i]} values, at least {shape.min_count} required"))
+                if shape.max_count is not None:
+                    for i in np.flatnonzero(counts > shape.max_count):
+                        violations.append(Violation(self.terms.decode(focus_ids[i]), str(shape.path), None,
+                                                    f"{name} has {counts[i]} values, at most {shape.max_count} allowed"))
+            if shape.class_ is not None or shape.datatype is not None:
+                is_focus = np.zeros(len(self.terms), dtype=bool)
+                is_focus[focus_ids] = True
+                for i in np.flatnonzero(is_focus[subject_ids]):
+                    subject, value = pairs[i]
+                    if shape.class_ is not None:
+                        value_id = self.terms.lookup(value)
+                        mask = self.member_mask(shape.class_)
+                        if isinstance(value, rdflib.Literal) or value_id is None or value_id >= len(mask) or not mask[value_id]:
+                            violations.append(Violation(subject, str(shape.path), value, f"Value of {name} is not a {shape.class_.split('/')[-1].split('#')[-1]}"))
+                    if shape.datatype is not None and (not isinstance(value, rdflib.Literal) or value.datatype != shape.datatype):
+                        violations.append(Violation(subject, str(shape.path), value, f"Value of {name} is not of datatype {shape.datatype}"))
+        return violations
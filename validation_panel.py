@@ -0,0 +1,69 @@
+import time
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTreeWidget, QTreeWidgetItem
+from PyQt5.QtCore import Qt
+from validation_engine import ValidationEngine
+
+
+class ValidationPanel(QWidget):
+    max_rows = 5000
+
+    def __init__(self, ontology_viewer):
+        super().__init__()
+        self.ontology_viewer = ontology_viewer
+        self.engine = None
+
+        self.layout = QVBoxLayout()
+        self.setLayout(self.layout)
+
+        self.validate_button = QPushButton("Validate All")
+        self.validate_button.clicked.connect(self.validate_all)
+        self.summary_label = QLabel("Not validated yet")
+
+        controls = QHBoxLayout()
+        controls.addWidget(self.validate_button)
+        controls.addWidget(self.summary_label)
+
+        self.violations_tree = QTreeWidget()
+        self.violations_tree.setHeaderLabels(["Focus Node", "Property", "Value", "Message"])
+        self.violations_tree.itemClicked.connect(self.on_violation_clicked)
+
+        self.layout.addLayout(controls)
+        self.layout.addWidget(self.violations_tree)
+
+    def reset(self):
+        viewer = self.ontology_viewer
+        self.engine = ValidationEngine(viewer.schema_graph, viewer.class_closure, viewer.type_index)
+        self.engine.load_shapes(viewer.graph)
+        self.violations_tree.clear()
+        self.summary_label.setText("Not validated yet")
+
+    def validate_all(self):
+        self.ontology_viewer.materialize()
+        if self.engine is None:
+            self.reset()
+        started = time.perf_counter()
+        self.engine.validate_all(self.ontology_viewer.graph)
+        self.show_violations(time.perf_counter() - started)
+
+    def validate_nodes(self, nodes):
+        # Incremental pass after an edit; only runs once a full pass has been done
+        if self.engine is None or self.engine.violations is None:
+            return
+        started = time.perf_counter()
+        self.engine.validate_nodes(self.ontology_viewer.graph, nodes)
+        self.show_violations(time.perf_counter() - started)
+
+    def show_violations(self, elapsed):
+        violations = [v for node_violations in self.engine.violations.values() for v in node_violations]
+        self.violations_tree.clear()
+        name = self.ontology_viewer.extract_last_part
+        for violation in violations[:self.max_rows]:
+            value = "" if violation.value is None else name(str(violation.value))
+            item = QTreeWidgetItem([name(str(violation.focus)), name(violation.path), value, violation.message])
+            item.setData(0, Qt.UserRole, str(violation.focus))
+            self.violations_tree.addTopLevelItem(item)
+        shown = f" (showing first {self.max_rows})" if len(violations) > self.max_rows else ""
+        self.summary_label.setText(f"{len(violations)} violations on {len(self.engine.violations)} nodes in {elapsed * 1000:.0f} ms{shown}")
+
+    def on_violation_clicked(self, item, column):
+        self.ontology_viewer.display_instance_info(item.data(0, Qt.UserRole))
@@ -0,0 +1,221 @@
+import threading
+import rdflib
+from rdflib.store import Store
+from rdflib.plugins.stores.memory import Memory
+
+
+class Version:
+    # An immutable state of the graph: a base graph that is never modified once
+    # it is shared, minus the removed triples, plus a small indexed overlay of
+    # added ones. Applying changes builds a new Version and leaves this one intact.
+
+    def __init__(self, number, base, added=frozenset(), removed=frozenset(), indexes=({}, {}, {})):
+        self.number = number
+        self.base = base
+        self.added = added
+        self.removed = removed
+        self.indexes = indexes  # term -> frozenset of added triples, by subject, predicate and object
+
+    def __len__(self):
+        return len(self.base) - len(self.removed) + len(self.added)
+
+    def __contains__(self, triple):
+        return triple in self.added or (triple not in self.removed and triple in self.base)
+
+    def overlay_size(self):
+        return len(self.added) + len(self.removed)
+
+    def triples(self, pattern):
+        removed = self.removed
+        for triple in self.base.triples(pattern):
+            if not removed or triple not in removed:
+                yield triple
+        if not self.added:
+            return
+        candidates = self.added
+        for position, term in enumerate(pattern):
+            if term is not None:
+                candidates = self.indexes[position].get(term, ())
+                break
+        for triple in candidates:
+            if all(term is None or term == value for term, value in zip(pattern, triple)):
+                yield triple
+
+    def apply(self, additions, removals):
+        # Returns (new version, triples actually added, triples actually removed)
+        added = set(self.added)
+        removed = set(self.removed)
+        buckets = ({}, {}, {})  # copies of only the index entries this change touches
+
+        def bucket(position, term):
+            if term not in buckets[position]:
+                buckets[position][term] = set(self.indexes[position].get(term, ()))
+            return buckets[position][term]
+
+        applied_added = []
+        applied_removed = []
+        for triple in removals:
+            if triple in added:
+                added.discard(triple)
+                for position, term in enumerate(triple):
+                    bucket(position, term).discard(triple)
+            elif triple in removed or triple not in self.base:
+                continue
+            else:
+                removed.add(triple)
+            applied_removed.append(triple)
+        for triple in additions:
+            if triple in removed:
+                removed.discard(triple)
+            elif triple in added or triple in self.base:
+                continue
+            else:
+                added.add(triple)
+                for position, term in enumerate(triple):
+                    bucket(position, term).add(triple)
+            applied_added.append(triple)
+        indexes = tuple(dict(index) for index in self.indexes)
+        for index, touched in zip(indexes, buckets):
+            for term, triples in touched.items():
+                if triples:
+                    index[term] = frozenset(triples)
+                else:
+                    index.pop(term, None)
+        version = Version(self.number + 1, self.base, frozenset(added), frozenset(removed), indexes)
+        return version, applied_added, applied_removed
+
+    def compacted(self):
+        base = rdflib.Graph()
+        base.addN((s, p, o, base) for s, p, o in self.triples((None, None, None)))
+        return Version(self.number, base)
+
+    def rebuilt(self, additions, removals):
+        # Like apply() followed by compacted(), without indexing a large batch into the overlay first
+        removed = [triple for triple in dict.fromkeys(removals) if triple in self]
+        removed_set = set(removed)
+        added = [triple for triple in dict.fromkeys(additions) if triple in removed_set or triple not in self]
+        base = rdflib.Graph()
+        base.addN((s, p, o, base) for s, p, o in self.triples((None, None, None)) if (s, p, o) not in removed_set)
+        base.addN((s, p, o, base) for s, p, o in added)
+        return Version(self.number + 1, base), added, removed
+
+
+class VersionedStore(Store):
+    # Read-copy-update store for the viewer's graph. Readers never lock: they
+    # read whichever Version is current, and snapshot() pins one for as long as
+    # a background reader needs it. Writers are serialized and publish each
+    # batch as a new Version with a single reference swap, so a reader sees
+    # either none or all of a batch.
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(self, compact_min=20000, compact_ratio=0.25):
+        super().__init__()
+        self.compact_min = compact_min
+        self.compact_ratio = compact_ratio
+        self.write_lock = threading.Lock()
+        self.namespace_store = Memory()
+        self.current = Version(0, rdflib.Graph())
+
+    def apply(self, additions, removals, published=None):
+        # published(added, removed) is called under the write lock as the new
+        # version becomes current, so callers can record batches in commit order
+        threshold = max(self.compact_min, len(self.current.base) * self.compact_ratio)
+        if len(additions) + len(removals) > threshold:
+            # Build a large batch without the lock so small writes aren't held up;
+            # if one got in meanwhile, build again on top of it
+            start = self.current
+            result = start.rebuilt(additions, removals)
+            with self.write_lock:
+                if self.current is not start:
+                    result = self.current.rebuilt(additions, removals)
+                return self.publish(*result, published)
+        with self.write_lock:
+            version, added, removed = self.current.apply(additions, removals)
+            # Fold the overlay into a fresh base once it stops being small; old snapshots keep the old base
+            if version.overlay_size() > threshold:
+                version = version.compacted()
+            return self.publish(version, added, removed, published)
+
+    def publish(self, version, added, removed, published):
+        self.current = version
+        if published:
+            published(added, removed)
+        return added, removed
+
+    def snapshot(self):
+        return rdflib.Graph(store=SnapshotStore(self.current, self.namespace_store))
+
+    def add(self, triple, context=None, quoted=False):
+        self.apply([triple], [])
+
+    def addN(self, quads):
+        self.apply([(s, p, o) for s, p, o, _ in quads], [])
+
+    def remove(self, triple_pattern, context=None):
+        self.apply([], list(self.current.triples(triple_pattern)))
+
+    def triples(self, triple_pattern, context=None):
+        for triple in self.current.triples(triple_pattern):
+            yield triple, iter(())
+
+    def __len__(self, context=None):
+        return len(self.current)
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def bind(self, prefix, namespace, override=True):
+        self.namespace_store.bind(prefix, namespace, override=override)
+
+    def namespace(self, prefix):
+        return self.namespace_store.namespace(prefix)
+
+    def prefix(self, namespace):
+        return self.namespace_store.prefix(namespace)
+
+    def namespaces(self):
+        return self.namespace_store.namespaces()
+
+
+class SnapshotStore(Store):
+    # Read-only view of one Version
+    context_aware = False
+    formula_aware = False
+    transaction_aware = False
+    graph_aware = False
+
+    def __init__(self, version, namespace_store):
+        super().__init__()
+        self.version = version
+        self.namespace_store = namespace_store
+
+    def add(self, triple, context=None, quoted=False):
+        raise TypeError("Graph snapshots are read-only")
+
+    def remove(self, triple_pattern, context=None):
+        raise TypeError("Graph snapshots are read-only")
+
+    def triples(self, triple_pattern, context=None):
+        for triple in self.version.triples(triple_pattern):
+            yield triple, iter(())
+
+    def __len__(self, context=None):
+        return len(self.version)
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def bind(self, prefix, namespace, override=True):
+        pass
+
+    def namespace(self, prefix):
+        return self.namespace_store.namespace(prefix)
+
+    def prefix(self, namespace):
+        return self.namespace_store.prefix(namespace)
+
+    def namespaces(self):
+        return self.namespace_store.namespaces()
@@ -22,32 +22,43 @@ class WizardEditor(QWidget):
         self.instance_uri_input = QLineEdit()
         self.instance_label_input = QLineEdit()
         
+        self.target_class_combo = QComboBox()
+        self.find_path_button = QPushButton("Find Property Path")
+        self.find_path_button.clicked.connect(self.find_path)
+        self.path_label = QLabel("")
+        self.path_label.setWordWrap(True)
+        
         self.layout.addRow(QLabel("Select Class:"), self.class_combo)
         self.layout.addRow(QLabel("Select Property:"), self.property_combo)
         self.layout.addRow(QLabel("Instance URI:"), self.instance_uri_input)
         self.layout.addRow(QLabel("Instance Label:"), self.instance_label_input)
         self.layout.addRow(self.instance_submit_button)
+        self.layout.addRow(QLabel("Path to Class:"), self.target_class_combo)
+        self.layout.addRow(self.find_path_button)
+        self.layout.addRow(self.path_label)
+    
+    def refresh_classes(self):
+        schema = self.ontology_viewer.schema_graph
+        for combo in (self.class_combo, self.target_class_combo):
+            combo.blockSignals(True)
+            combo.clear()
+            self.fill_combo(combo, schema.classes)
+            combo.setCurrentIndex(-1)
+            combo.blockSignals(False)
     
     def set_selected_class(self, class_uri):
         self.selected_class = class_uri
+        index = self.class_combo.findData(class_uri)
+        if index != self.class_combo.currentIndex():
+            self.class_combo.blockSignals(True)
+            self.class_combo.setCurrentIndex(index)
+            self.class_combo.blockSignals(False)
         self.update_properties()
     
     def update_properties(self):
         self.property_combo.blockSignals(True)
         self.property_combo.clear()
-        query = f"""
-        SELECT ?property WHERE {{
-            {{ ?property rdfs:domain <{self.selected_class}> }} UNION {{ ?property rdfs:range <{self.selected_class}> }}
-            UNION {{
-                ?superclass rdfs:subClassOf <{self.selected_class}> .
-                ?property rdfs:domain ?superclass
-            }} UNION {{
-                ?superclass rdfs:subClassOf <{self.selected_class}> .
-                ?property rdfs:range ?superclass
-            }}
-        }}
-        """
-        self.execute_query(query, self.property_combo)
+        self.fill_combo(self.property_combo, self.ontology_viewer.schema_graph.applicable_properties(self.selected_class))
         self.property_combo.blockSignals(False)
     
     def on_class_selected(self):
@@ -65,12 +76,7 @@ class WizardEditor(QWidget):
             self.layout.addRow(QLabel("Select Class for Property:"), new_class_combo)
             self.property_class_pairs.append((selected_property_uri, new_class_combo))
             
-            query = f"""
-            SELECT ?class WHERE {{
-                {{ <{selected_property_uri}> rdfs:domain ?class }} UNION {{ <{selected_property_uri}> rdfs:range ?class }}
-            }}
-            """
-            self.execute_query(query, new_class_combo)
+            self.fill_combo(new_class_combo, self.ontology_viewer.schema_graph.property_classes(selected_property_uri))
     
     def on_class_selected_for_property(self):
         print("on_class_selected_for_property triggered")
@@ -80,19 +86,7 @@ class WizardEditor(QWidget):
             self.layout.addRow(QLabel("Select Property for Class:"), new_property_combo)
             self.property_class_pairs.append((selected_class_uri, new_property_combo))
             
-            query = f"""
-            SELECT ?property WHERE {{
-                {{ ?property rdfs:domain <{selected_class_uri}> }} UNION {{ ?property rdfs:range <{selected_class_uri}> }}
-                UNION {{
-                    ?superclass rdfs:subClassOf <{selected_class_uri}> .
-                    ?property rdfs:domain ?superclass
-                }} UNION {{
-                    ?superclass rdfs:subClassOf <{selected_class_uri}> .
-                    ?property rdfs:range ?superclass
-                }}
-            }}
-            """
-            self.execute_query(query, new_property_combo)
+            self.fill_combo(new_property_combo, self.ontology_viewer.schema_graph.applicable_properties(selected_class_uri))
     
     def add_instance(self):
         if not self.selected_class:
@@ -104,35 +98,51 @@ class WizardEditor(QWidget):
         
         if instance_uri and instance_label:
             instance = rdflib.URIRef(instance_uri)
-            self.ontology_viewer.graph.add((instance, rdflib.RDF.type, rdflib.URIRef(self.selected_class)))
-            self.ontology_viewer.graph.add((instance, rdflib.RDFS.label, rdflib.Literal(instance_label)))
+            triples = [
+                (instance, rdflib.RDF.type, rdflib.URIRef(self.selected_class)),
+                (instance, rdflib.RDFS.label, rdflib.Literal(instance_label)),
+            ]
             
             for prop_uri, class_combo in self.property_class_pairs:
                 selected_class_uri = class_combo.currentData()
                 if selected_class_uri:
-                    self.ontology_viewer.graph.add((instance, rdflib.URIRef(prop_uri), rdflib.URIRef(selected_class_uri)))
+                    triples.append((instance, rdflib.URIRef(prop_uri), rdflib.URIRef(selected_class_uri)))
+            self.ontology_viewer.add_triples(triples)
             
             print(f"Added instance: {instance_uri} of class {self.selected_class} with label {instance_label}")
             self.clear_inputs()
     
     def clear_inputs(self):
+        self.selected_class = None
         self.property_combo.clear()
-        self.class_combo.clear()
+        self.class_combo.blockSignals(True)
+        self.class_combo.setCurrentIndex(-1)
+        self.class_combo.blockSignals(False)
         self.instance_uri_input.clear()
         self.instance_label_input.clear()
         for _, class_combo in self.property_class_pairs:
             class_combo.clear()
         self.property_class_pairs.clear()
     
-    def execute_query(self, query, combo_box):
-        print(f"Executing query: {query}")
-        try:
-            for row in self.ontology_viewer.graph.query(query):
-                uri = str(row[0])
-                short_name = self.ontology_viewer.extract_last_part(uri)
-                combo_box.addItem(short_name, uri)
-        except Exception as e:
-            print(f"Error executing query: {e}")
+    def find_path(self):
+        target_class_uri = self.target_class_combo.currentData()
+        if not self.selected_class or not target_class_uri:
+            self.path_label.setText("Select a start class and a target class")
+            return
+        path = self.ontology_viewer.schema_graph.shortest_path(self.selected_class, target_class_uri)
+        if path is None:
+            self.path_label.setText("No property path found")
+            return
+        name = self.ontology_viewer.display_name
+        steps = [name(self.selected_class)]
+        for _, property_uri, class_uri in path:
+            steps.append(f"--{name(property_uri)}--> {name(class_uri)}")
+        self.path_label.setText(" ".join(steps))
+    
+    def fill_combo(self, combo_box, uris):
+        short_names = sorted((self.ontology_viewer.extract_last_part(uri), uri) for uri in uris)
+        for short_name, uri in short_names:
+            combo_box.addItem(short_name, uri)
 
 if __name__ == "__main__":
     import sys